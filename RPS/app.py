@@ -1,9 +1,24 @@
+import time
+STARTUP_BEGIN = time.perf_counter()
+
 import customtkinter as ctk
+import json
+import os
 from datetime import datetime
-from data_utils import create_charts
-from game_utils import RPSGame
-from user_utils import UserManager
-import pandas as pd
+import metrics
+from background import TaskRunner
+from history_view import VirtualHistoryList
+from session import GameSession
+from storage import open_storage
+from write_behind import WriteBehindStorage
+
+# Startup stages as (name, perf_counter) pairs, reported once the login
+# screen is up. pandas and matplotlib are imported on first use and every
+# frame except login is built on first navigation, so neither shows up here.
+startup_marks = [("imports", time.perf_counter())]
+
+def mark_startup(stage):
+    startup_marks.append((stage, time.perf_counter()))
 
 # Set appearance mode and default color theme
 ctk.set_appearance_mode("dark")
@@ -22,9 +37,28 @@ screen_height = app.winfo_screenheight()
 x = (screen_width - 1000) // 2
 y = (screen_height - 600) // 2
 app.geometry(f"1000x600+{x}+{y}")
+mark_startup("window")
+
+# RPS_METRICS=<file> turns on timers and counters (see metrics.py)
+metrics.enable_from_env()
+
+# Open the storage backend (set RPS_STORAGE=sqlite to use the database, or
+# binary for the spreadsheets with a fixed-width binary history file)
+storage = open_storage(os.environ.get("RPS_STORAGE", "excel"))
 
-# Initialize user manager
-user_manager = UserManager()
+# Queue rounds in memory and write them in the background (RPS_WRITE_BEHIND=0 to disable)
+if os.environ.get("RPS_WRITE_BEHIND", "1") != "0":
+    storage = WriteBehindStorage(storage)
+
+# The GUI drives a single headless session; user_manager and game are its parts.
+# RPS_OPPONENT=markov (or frequency, pattern) plays an adaptive computer instead of a random one
+opponent = None
+if os.environ.get("RPS_OPPONENT", "random") != "random":
+    from strategies import make_opponent
+    opponent = make_opponent(os.environ["RPS_OPPONENT"])
+session = GameSession(storage, opponent=opponent)
+user_manager = session.user_manager
+mark_startup("storage")
 
 # Configure grid layout
 app.grid_rowconfigure(0, weight=1)
@@ -46,8 +80,22 @@ logo_label = ctk.CTkLabel(sidebar_frame, text="Prithika",
                          text_color=("#1F538D", "#3B8ED0"))
 logo_label.grid(row=0, column=0, padx=20, pady=(30, 30))
 
+# Shown while a login, round or logout is waiting on the store
+busy_bar = ctk.CTkProgressBar(sidebar_frame, mode="indeterminate", width=160)
+
+def set_busy(busy):
+    if busy:
+        busy_bar.grid(row=9, column=0, padx=20, pady=(10, 0), sticky="ew")
+        busy_bar.start()
+    else:
+        busy_bar.stop()
+        busy_bar.grid_remove()
+
+# Storage calls run here so the window keeps repainting while they wait
+tasks = TaskRunner(app, on_busy=set_busy)
+
 # Initialize game
-game = RPSGame()
+game = session.game
 
 # Update navigation buttons
 button_style = {
@@ -57,8 +105,15 @@ button_style = {
     "font": ctk.CTkFont(family="Roboto", size=14)
 }
 
-# Create frames dictionary to store different views
+# Create frames dictionary to store different views. Frames other than
+# login are built by their entry in frame_builders the first time they are shown
 frames = {}
+frame_builders = {}
+
+def get_frame(frame_name):
+    if frame_name not in frames:
+        frame_builders[frame_name]()
+    return frames[frame_name]
 
 def show_frame(frame_name):
     # Check authentication for protected frames
@@ -70,12 +125,14 @@ def show_frame(frame_name):
     for frame in frames.values():
         frame.grid_remove()
     
+    frame = get_frame(frame_name)
+    
     if frame_name == 'dashboard' and user_manager.is_authenticated():
         update_stats_display()
     elif frame_name == 'history' and user_manager.is_authenticated():
         update_history_display()
         
-    frames[frame_name].grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
+    frame.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
     
     # Update navigation buttons based on authentication state
     update_navigation()
@@ -124,16 +181,10 @@ def update_navigation():
         btn.grid(row=i, column=0, padx=20, pady=10, sticky="ew")
 
 def handle_logout():
-    user_manager.logout()
-    show_frame('login')
-
-# Create main dashboard frame
-dashboard_frame = ctk.CTkFrame(app, fg_color="transparent")
-frames['dashboard'] = dashboard_frame
-dashboard_frame.grid_columnconfigure(0, weight=1)
+    # Writes out any queued rounds before the session ends
+    tasks.submit('logout', session.logout, on_done=lambda _: show_frame('login'))
 
-# Create other frames
-for frame_name in ['game', 'history']:
+def create_titled_frame(frame_name):
     frame = ctk.CTkFrame(app, fg_color="transparent")
     frames[frame_name] = frame
     frame.grid_columnconfigure(0, weight=1)
@@ -142,6 +193,7 @@ for frame_name in ['game', 'history']:
     title = ctk.CTkLabel(frame, text=frame_name.title(),
                         font=ctk.CTkFont(family="Helvetica", size=32, weight="bold"))
     title.grid(row=0, column=0, padx=20, pady=(20,30), sticky="w")
+    return frame
 
 # Create login frame
 login_frame = ctk.CTkFrame(app, fg_color="transparent")
@@ -179,15 +231,34 @@ def handle_login():
         login_message.configure(text="Please fill all fields")
         return
         
-    success, message = user_manager.authenticate(username, password)
+    # Authenticates and loads the user's game state on the worker
+    if tasks.submit('login', login_task, username, password,
+                    on_done=finish_login, on_error=login_failed):
+        login_button.configure(state="disabled", text="Logging in...")
+
+def login_task(username, password):
+    # Runs on the worker. The leaderboard reads every stats row, so it is
+    # built here once rather than when the dashboard is first drawn
+    outcome = session.login(username, password)
+    if outcome[0] and game.leaderboard is None:
+        from leaderboard import Leaderboard
+        game.leaderboard = Leaderboard.from_storage(storage)
+    return outcome
+
+def finish_login(outcome):
+    success, message = outcome
+    login_button.configure(state="normal", text="Login")
     if success:
-        # Set the current user in the game
-        game.set_user(username)
         login_message.configure(text="")
         show_frame('dashboard')
     else:
         login_message.configure(text=message)
 
+def login_failed(error):
+    # The storage failed, not the credentials; let the user try again
+    login_button.configure(state="normal", text="Login")
+    login_message.configure(text=f"Login failed: {error}")
+
 login_button = ctk.CTkButton(login_container, 
                             text="Login", 
                             command=handle_login,
@@ -202,196 +273,253 @@ register_link = ctk.CTkButton(login_container,
                              hover_color=("gray80", "gray30"))
 register_link.grid(row=5, column=0, columnspan=2, padx=20, pady=(0, 30))
 
-# Create register frame
-register_frame = ctk.CTkFrame(app, fg_color="transparent")
-frames['register'] = register_frame
-register_frame.grid_columnconfigure(0, weight=1)
-
-# Create registration form
-register_container = ctk.CTkFrame(register_frame, fg_color=("#E3E3E3", "#2B2B2B"), corner_radius=15)
-register_container.grid(row=0, column=0, padx=100, pady=80)
-
-register_title = ctk.CTkLabel(register_container, 
-                             text="Register New Account",
-                             font=ctk.CTkFont(family="Helvetica", size=28, weight="bold"))
-register_title.grid(row=0, column=0, columnspan=2, padx=40, pady=(30, 20))
-
-reg_username_label = ctk.CTkLabel(register_container, text="Username:")
-reg_username_label.grid(row=1, column=0, padx=20, pady=10, sticky="e")
-reg_username_entry = ctk.CTkEntry(register_container, width=200)
-reg_username_entry.grid(row=1, column=1, padx=20, pady=10, sticky="w")
-
-reg_email_label = ctk.CTkLabel(register_container, text="Email:")
-reg_email_label.grid(row=2, column=0, padx=20, pady=10, sticky="e")
-reg_email_entry = ctk.CTkEntry(register_container, width=200)
-reg_email_entry.grid(row=2, column=1, padx=20, pady=10, sticky="w")
-
-reg_password_label = ctk.CTkLabel(register_container, text="Password:")
-reg_password_label.grid(row=3, column=0, padx=20, pady=10, sticky="e")
-reg_password_entry = ctk.CTkEntry(register_container, width=200, show="*")
-reg_password_entry.grid(row=3, column=1, padx=20, pady=10, sticky="w")
-
-reg_confirm_label = ctk.CTkLabel(register_container, text="Confirm Password:")
-reg_confirm_label.grid(row=4, column=0, padx=20, pady=10, sticky="e")
-reg_confirm_entry = ctk.CTkEntry(register_container, width=200, show="*")
-reg_confirm_entry.grid(row=4, column=1, padx=20, pady=10, sticky="w")
-
-register_message = ctk.CTkLabel(register_container, text="", text_color="red")
-register_message.grid(row=5, column=0, columnspan=2, padx=20, pady=5)
-
-def handle_registration():
-    username = reg_username_entry.get()
-    email = reg_email_entry.get()
-    password = reg_password_entry.get()
-    confirm = reg_confirm_entry.get()
-    
-    # Validation
-    if not username or not email or not password or not confirm:
-        register_message.configure(text="Please fill all fields")
-        return
+def build_register():
+    # Create register frame
+    register_frame = ctk.CTkFrame(app, fg_color="transparent")
+    frames['register'] = register_frame
+    register_frame.grid_columnconfigure(0, weight=1)
+
+    # Create registration form
+    register_container = ctk.CTkFrame(register_frame, fg_color=("#E3E3E3", "#2B2B2B"), corner_radius=15)
+    register_container.grid(row=0, column=0, padx=100, pady=80)
+
+    register_title = ctk.CTkLabel(register_container, 
+                                 text="Register New Account",
+                                 font=ctk.CTkFont(family="Helvetica", size=28, weight="bold"))
+    register_title.grid(row=0, column=0, columnspan=2, padx=40, pady=(30, 20))
+
+    reg_username_label = ctk.CTkLabel(register_container, text="Username:")
+    reg_username_label.grid(row=1, column=0, padx=20, pady=10, sticky="e")
+    reg_username_entry = ctk.CTkEntry(register_container, width=200)
+    reg_username_entry.grid(row=1, column=1, padx=20, pady=10, sticky="w")
+
+    reg_email_label = ctk.CTkLabel(register_container, text="Email:")
+    reg_email_label.grid(row=2, column=0, padx=20, pady=10, sticky="e")
+    reg_email_entry = ctk.CTkEntry(register_container, width=200)
+    reg_email_entry.grid(row=2, column=1, padx=20, pady=10, sticky="w")
+
+    reg_password_label = ctk.CTkLabel(register_container, text="Password:")
+    reg_password_label.grid(row=3, column=0, padx=20, pady=10, sticky="e")
+    reg_password_entry = ctk.CTkEntry(register_container, width=200, show="*")
+    reg_password_entry.grid(row=3, column=1, padx=20, pady=10, sticky="w")
+
+    reg_confirm_label = ctk.CTkLabel(register_container, text="Confirm Password:")
+    reg_confirm_label.grid(row=4, column=0, padx=20, pady=10, sticky="e")
+    reg_confirm_entry = ctk.CTkEntry(register_container, width=200, show="*")
+    reg_confirm_entry.grid(row=4, column=1, padx=20, pady=10, sticky="w")
+
+    register_message = ctk.CTkLabel(register_container, text="", text_color="red")
+    register_message.grid(row=5, column=0, columnspan=2, padx=20, pady=5)
+
+    def handle_registration():
+        username = reg_username_entry.get()
+        email = reg_email_entry.get()
+        password = reg_password_entry.get()
+        confirm = reg_confirm_entry.get()
+    
+        # Validation
+        if not username or not email or not password or not confirm:
+            register_message.configure(text="Please fill all fields")
+            return
         
-    if password != confirm:
-        register_message.configure(text="Passwords don't match")
-        return
-    
-    success, message = user_manager.register_user(username, password, email)
-    if success:
-        register_message.configure(text="Registration successful!", text_color="green")
-        # Clear fields
-        reg_username_entry.delete(0, 'end')
-        reg_email_entry.delete(0, 'end')
-        reg_password_entry.delete(0, 'end')
-        reg_confirm_entry.delete(0, 'end')
-        # Redirect to login after 2 seconds
-        app.after(2000, lambda: show_frame('login'))
-    else:
-        register_message.configure(text=message)
-
-register_button = ctk.CTkButton(register_container, 
-                               text="Register", 
-                               command=handle_registration,
-                               fg_color=("#1F538D", "#3B8ED0"),
-                               hover_color=("#163d67", "#2a6faa"))
-register_button.grid(row=6, column=0, columnspan=2, padx=20, pady=20)
-
-login_link = ctk.CTkButton(register_container, 
-                          text="Already have an account? Login", 
-                          command=lambda: show_frame('login'),
-                          fg_color="transparent",
-                          hover_color=("gray80", "gray30"))
-login_link.grid(row=7, column=0, columnspan=2, padx=20, pady=(0, 30))
-
-# Dashboard content
-# Header with date
-header_frame = ctk.CTkFrame(dashboard_frame, height=100)
-header_frame.grid(row=0, column=0, sticky="ew", pady=(0, 20))
-header_frame.grid_columnconfigure(1, weight=1)
-
-current_time = datetime.now().strftime("%B %d, 2023")
-time_label = ctk.CTkLabel(header_frame, text=current_time, 
-                         font=ctk.CTkFont(family="Arial", size=15, weight="bold"))
-time_label.grid(row=0, column=2, padx=20, pady=20)
-
-# Welcome section
-welcome_frame = ctk.CTkFrame(dashboard_frame)
-welcome_frame.grid(row=1, column=0, sticky="ew", pady=(0, 20))
-welcome_frame.grid_columnconfigure(0, weight=1)
-
-welcome_label = ctk.CTkLabel(welcome_frame, 
-                            text="👋 Welcome back, {username}!",
-                            font=ctk.CTkFont(family="Helvetica", size=32, weight="bold"))
-welcome_label.grid(row=0, column=0, padx=20, pady=(20,10), sticky="w")
-
-# Statistics cards with reduced height
-stats_frame = ctk.CTkFrame(dashboard_frame)
-stats_frame.grid(row=2, column=0, sticky="ew", pady=(0, 15))
-stats_frame.grid_columnconfigure((0,1,2), weight=1)
-
-# Create three statistics cards
-stats_data = [
-    ("Total Projects", "125", "📁"),
-    ("Active Tasks", "42", "✔️"),
-    ("Completed", "83", "🎯")
-]
-
-for idx, (title, value, icon) in enumerate(stats_data):
-    card = ctk.CTkFrame(stats_frame)
-    card.grid(row=0, column=idx, padx=10, pady=5, sticky="ew")
-    
-    icon_label = ctk.CTkLabel(card, text=icon, 
-                             font=ctk.CTkFont(family="Segoe UI", size=24))
-    icon_label.grid(row=0, column=0, padx=20, pady=(10,2))
-    
-    value_label = ctk.CTkLabel(card, text=value, 
-                              font=ctk.CTkFont(family="Helvetica", size=24, weight="bold"))
-    value_label.grid(row=1, column=0, padx=20, pady=2)
-    
-    title_label = ctk.CTkLabel(card, text=title, 
-                              font=ctk.CTkFont(family="Arial", size=14))
-    title_label.grid(row=2, column=0, padx=20, pady=(2,10))
-
-# Analytics charts
-charts_frame = ctk.CTkFrame(dashboard_frame)
-charts_frame.grid(row=3, column=0, sticky="nsew", padx=20, pady=(0,20))
-
-# Create and add charts
-charts_widget = create_charts(charts_frame)
-charts_widget.pack(fill="both", expand=True)
-
-# Modify dashboard to show game stats
-def update_stats_display():
-    # Update welcome message with current username
-    if user_manager.is_authenticated():
-        username = user_manager.get_current_user()
-        welcome_label.configure(text=f"👋 Welcome back, {username}!")
-    
-    stats = game.get_stats()
+        if password != confirm:
+            register_message.configure(text="Passwords don't match")
+            return
+    
+        tasks.submit('register', session.register, username, password, email,
+                     on_done=finish_registration)
+
+    def finish_registration(outcome):
+        success, message = outcome
+        if success:
+            register_message.configure(text="Registration successful!", text_color="green")
+            # Clear fields
+            reg_username_entry.delete(0, 'end')
+            reg_email_entry.delete(0, 'end')
+            reg_password_entry.delete(0, 'end')
+            reg_confirm_entry.delete(0, 'end')
+            # Redirect to login after 2 seconds
+            app.after(2000, lambda: show_frame('login'))
+        else:
+            register_message.configure(text=message)
+
+    register_button = ctk.CTkButton(register_container, 
+                                   text="Register", 
+                                   command=handle_registration,
+                                   fg_color=("#1F538D", "#3B8ED0"),
+                                   hover_color=("#163d67", "#2a6faa"))
+    register_button.grid(row=6, column=0, columnspan=2, padx=20, pady=20)
+
+    login_link = ctk.CTkButton(register_container, 
+                              text="Already have an account? Login", 
+                              command=lambda: show_frame('login'),
+                              fg_color="transparent",
+                              hover_color=("gray80", "gray30"))
+    login_link.grid(row=7, column=0, columnspan=2, padx=20, pady=(0, 30))
+
+frame_builders['register'] = build_register
+
+def build_dashboard():
+    global welcome_label, stats_value_labels, charts_frame, charts_widget, leaderboard_labels
+    
+    # Create main dashboard frame
+    dashboard_frame = ctk.CTkFrame(app, fg_color="transparent")
+    frames['dashboard'] = dashboard_frame
+    dashboard_frame.grid_columnconfigure(0, weight=1)
+    
+    # Dashboard content
+    # Header with date
+    header_frame = ctk.CTkFrame(dashboard_frame, height=100)
+    header_frame.grid(row=0, column=0, sticky="ew", pady=(0, 20))
+    header_frame.grid_columnconfigure(1, weight=1)
+
+    current_time = datetime.now().strftime("%B %d, 2023")
+    time_label = ctk.CTkLabel(header_frame, text=current_time, 
+                             font=ctk.CTkFont(family="Arial", size=15, weight="bold"))
+    time_label.grid(row=0, column=2, padx=20, pady=20)
+
+    # Welcome section
+    welcome_frame = ctk.CTkFrame(dashboard_frame)
+    welcome_frame.grid(row=1, column=0, sticky="ew", pady=(0, 20))
+    welcome_frame.grid_columnconfigure(0, weight=1)
+
+    welcome_label = ctk.CTkLabel(welcome_frame, 
+                                text="👋 Welcome back, {username}!",
+                                font=ctk.CTkFont(family="Helvetica", size=32, weight="bold"))
+    welcome_label.grid(row=0, column=0, padx=20, pady=(20,10), sticky="w")
+
+    # Statistics cards with reduced height
+    stats_frame = ctk.CTkFrame(dashboard_frame)
+    stats_frame.grid(row=2, column=0, sticky="ew", pady=(0, 15))
+    stats_frame.grid_columnconfigure((0,1,2), weight=1)
+
+    # Create three statistics cards once; later updates only change the values
     stats_data = [
-        ("Total Games", str(stats['total_games']), "🎮"),
-        ("Wins", str(stats['wins']), "🏆"),
-        ("Win Rate", stats['win_rate'], "📈")
+        ("Total Games", "0", "🎮"),
+        ("Wins", "0", "🏆"),
+        ("Win Rate", "0.0%", "📈")
     ]
-    
+    stats_value_labels = []
+
+    # Fonts are shared by all cards
+    stats_icon_font = ctk.CTkFont(family="Segoe UI", size=24)
+    stats_value_font = ctk.CTkFont(family="Helvetica", size=24, weight="bold")
+    stats_title_font = ctk.CTkFont(family="Arial", size=14)
+
     for idx, (title, value, icon) in enumerate(stats_data):
         card = ctk.CTkFrame(stats_frame)
         card.grid(row=0, column=idx, padx=10, pady=5, sticky="ew")
-        
-        icon_label = ctk.CTkLabel(card, text=icon, 
-                                font=ctk.CTkFont(family="Segoe UI", size=24))
+    
+        icon_label = ctk.CTkLabel(card, text=icon, font=stats_icon_font)
         icon_label.grid(row=0, column=0, padx=20, pady=(10,2))
-        
-        value_label = ctk.CTkLabel(card, text=value, 
-                                font=ctk.CTkFont(family="Helvetica", size=24, weight="bold"))
+    
+        value_label = ctk.CTkLabel(card, text=value, font=stats_value_font)
         value_label.grid(row=1, column=0, padx=20, pady=2)
-        
-        title_label = ctk.CTkLabel(card, text=title, 
-                                font=ctk.CTkFont(family="Arial", size=14))
+        stats_value_labels.append(value_label)
+    
+        title_label = ctk.CTkLabel(card, text=title, font=stats_title_font)
         title_label.grid(row=2, column=0, padx=20, pady=(2,10))
 
-# Add back history display function
-def update_history_display():
-    history_frame = frames['history']
+    # Analytics charts (matplotlib is only imported once the dashboard is built)
+    from data_utils import create_charts
+
+    charts_frame = ctk.CTkFrame(dashboard_frame)
+    charts_frame.grid(row=3, column=0, sticky="nsew", padx=20, pady=(0,20))
+
+    # Create and add charts
+    charts_widget = create_charts(charts_frame)
+    charts_widget.pack(fill="both", expand=True)
+
+    # Leaderboard panel: built by the login task, then updated by each round
+    from leaderboard import BOARDS
+
+    leaderboard_frame = ctk.CTkFrame(dashboard_frame)
+    leaderboard_frame.grid(row=4, column=0, sticky="ew", padx=20, pady=(0, 20))
+    leaderboard_frame.grid_columnconfigure(tuple(range(len(BOARDS))), weight=1)
+
+    board_title_font = ctk.CTkFont(family="Arial", size=14, weight="bold")
+    board_entry_font = ctk.CTkFont(family="Arial", size=13)
+    leaderboard_labels = {}
+    for column, (board, title) in enumerate(BOARDS.items()):
+        if board == 'win_rate':
+            title += f" (min {game.leaderboard.min_games} games)"
+        title_label = ctk.CTkLabel(leaderboard_frame, text=title, font=board_title_font)
+        title_label.grid(row=0, column=column, padx=10, pady=(10, 5), sticky="w")
+        leaderboard_labels[board] = []
+        for row in range(LEADERBOARD_SIZE):
+            entry_label = ctk.CTkLabel(leaderboard_frame, text="", font=board_entry_font, anchor="w")
+            entry_label.grid(row=row + 1, column=column, padx=10, pady=(0, 2), sticky="w")
+            leaderboard_labels[board].append(entry_label)
+
+frame_builders['dashboard'] = build_dashboard
+
+# Last values shown on the dashboard, used to skip no-op updates
+displayed_stats = {}
+
+# Players listed on each leaderboard
+LEADERBOARD_SIZE = 5
+
+def format_leader(board, entry):
+    text = f"{entry['rank']}. {entry['username']}  "
+    if board == 'wins':
+        return text + f"{entry['wins']} wins"
+    if board == 'win_rate':
+        return text + f"{entry['win_rate']:.1f}% ({entry['total_games']} games)"
+    return text + f"{entry['total_games']} games"
+
+def update_leaderboard_display():
+    for board, labels in leaderboard_labels.items():
+        entries = game.leaderboard.top(board, LEADERBOARD_SIZE)
+        texts = [format_leader(board, entry) for entry in entries]
+        texts += [""] * (len(labels) - len(texts))
+        if displayed_stats.get(board) == texts:
+            continue
+        for label, text in zip(labels, texts):
+            label.configure(text=text)
+        displayed_stats[board] = texts
+
+# Modify dashboard to show game stats
+@metrics.timed("ui.stats_refresh")
+def update_stats_display():
+    # Nothing to update until the dashboard has been built
+    if 'dashboard' not in frames:
+        return
     
-    # Clear existing content
-    for widget in history_frame.winfo_children():
-        widget.destroy()
+    # Update welcome message with current username
+    if user_manager.is_authenticated():
+        username = user_manager.get_current_user()
+        if displayed_stats.get('username') != username:
+            welcome_label.configure(text=f"👋 Welcome back, {username}!")
+            displayed_stats['username'] = username
     
-    # Title
-    title = ctk.CTkLabel(history_frame, text="Game History",
-                        font=ctk.CTkFont(family="Helvetica", size=32, weight="bold"))
-    title.grid(row=0, column=0, padx=20, pady=(20,30))
+    stats = game.get_stats()
+    values = [str(stats['total_games']), str(stats['wins']), stats['win_rate']]
+    if displayed_stats.get('values') == values:
+        return
     
-    # Create scrollable frame
-    scroll_frame = ctk.CTkScrollableFrame(history_frame, width=800, height=400)
-    scroll_frame.grid(row=1, column=0, padx=20, pady=20, sticky="nsew")
+    for value_label, value in zip(stats_value_labels, values):
+        value_label.configure(text=value)
+    displayed_stats['values'] = values
+
+    # Rankings only move when the user's own stats do
+    update_leaderboard_display()
+
+def build_history():
+    global history_list
+    history_frame = create_titled_frame('history')
     
-    # Add history entries
-    for i, record in enumerate(reversed(game.game_history[-50:])):  # Show last 50 games
-        entry = f"{record['datetime']} - Player: {record['player'].title()} vs Computer: {record['computer'].title()} - "
-        entry += "Win 🎉" if record['result'] == 'wins' else "Loss 😢" if record['result'] == 'losses' else "Tie 🤝"
-        
-        label = ctk.CTkLabel(scroll_frame, text=entry, anchor="w")
-        label.grid(row=i, column=0, padx=10, pady=5, sticky="w")
+    # History list: built once, its rows are recycled while scrolling
+    history_list = VirtualHistoryList(history_frame, height=400, tasks=tasks)
+    history_list.grid(row=1, column=0, padx=20, pady=20, sticky="nsew")
+
+frame_builders['history'] = build_history
+
+def update_history_display():
+    history_list.show(game.game_history, game.total_games)
+
+# Game modes: rounds per series. A best-of series is picked move by move,
+# then played and saved in one go
+SERIES_MODES = {"Single": 1, "Best of 3": 3, "Best of 5": 5, "Best of 7": 7}
 
 # Create game interface
 def create_game_interface():
@@ -434,8 +562,51 @@ def create_game_interface():
     
     # Choice buttons with enhanced styling
     def play_game(choice):
-        computer_choice, result = game.play(choice)
-        
+        rounds = SERIES_MODES[mode_selector.get()]
+        if rounds == 1:
+            # Ignored while the previous round is still being saved
+            tasks.submit('play', game.play, choice,
+                         on_done=lambda outcome: show_result(choice, *outcome))
+            return
+        if tasks.busy('play'):
+            return
+
+        # Best of N: collect the picks, then play the whole series in one write
+        series_picks.append(choice)
+        if len(series_picks) < rounds:
+            picks_label.configure(text=f"Pick {len(series_picks) + 1} of {rounds}: "
+                                       + ", ".join(series_picks))
+            return
+        picks = list(series_picks)
+        series_picks.clear()
+        picks_label.configure(text="")
+        tasks.submit('play', game.play_many, picks,
+                     on_done=lambda outcomes: show_series(picks, outcomes))
+
+    def show_series(picks, outcomes):
+        results = [result for _, result in outcomes]
+        wins, losses = results.count('wins'), results.count('losses')
+        rounds_text = "  ".join(f"{pick[0].upper()}:{computer[0].upper()}"
+                                for pick, (computer, _) in zip(picks, outcomes))
+        result_text = f"{rounds_text}\nWins {wins} | Losses {losses} | Ties {len(results) - wins - losses}\n"
+        if wins > losses:
+            result_text += "🏆 You win the series! 🏆"
+            result_label.configure(text_color=("#28A745", "#28A745"))
+        elif losses > wins:
+            result_text += "😢 Computer wins the series 😢"
+            result_label.configure(text_color=("#DC3545", "#DC3545"))
+        else:
+            result_text += "🤝 The series is a draw 🤝"
+            result_label.configure(text_color=("#FFC107", "#FFC107"))
+        result_label.configure(text=result_text)
+        refresh_scores()
+
+    def start_series(mode):
+        series_picks.clear()
+        rounds = SERIES_MODES[mode]
+        picks_label.configure(text=f"Pick 1 of {rounds}" if rounds > 1 else "")
+
+    def show_result(choice, computer_choice, result):
         # Animated result display
         result_text = f"You chose {choice}\nComputer chose {computer_choice}\n"
         if result == 'wins':
@@ -449,20 +620,26 @@ def create_game_interface():
             result_label.configure(text_color=("#FFC107", "#FFC107"))
             
         result_label.configure(text=result_text)
-        
+        refresh_scores()
+
+    def refresh_scores():
         # Update score display
         stats = game.get_stats()
         score_text = f"Wins: {stats['wins']} | Total Games: {stats['total_games']} | Win Rate: {stats['win_rate']}"
         score_label.configure(text=score_text)
         
-        # Get game analytics data
-        analytics_data = {
-            'moves': game.get_move_distribution(),
-            'trend': game.get_winrate_trend()
-        }
-        
         # Update charts if on dashboard
         if 'dashboard' in frames:
+            from data_utils import MAX_TREND_POINTS
+            
+            # Get game analytics data
+            trend_rounds, trend = game.get_winrate_trend(MAX_TREND_POINTS, positions=True)
+            analytics_data = {
+                'moves': game.get_move_distribution(),
+                'trend': trend,
+                'trend_rounds': trend_rounds
+            }
+            
             charts_widget = charts_frame.winfo_children()[0]
             charts_widget.update_charts(analytics_data)
         
@@ -508,8 +685,24 @@ def create_game_interface():
         btn.bind("<Enter>", on_enter)
         btn.bind("<Leave>", on_leave)
 
-# Initialize game interface
-create_game_interface()
+    # Series mode and the picks made so far
+    series_picks = []
+    mode_selector = ctk.CTkSegmentedButton(game_container,
+                                           values=list(SERIES_MODES),
+                                           command=start_series)
+    mode_selector.set("Single")
+    mode_selector.grid(row=4, column=0, columnspan=3, pady=(0, 10))
+
+    picks_label = ctk.CTkLabel(game_container, text="",
+                               font=ctk.CTkFont(family="Arial", size=14),
+                               text_color=("#666666", "#999999"))
+    picks_label.grid(row=5, column=0, columnspan=3, pady=(0, 20))
+
+def build_game():
+    create_titled_frame('game')
+    create_game_interface()
+
+frame_builders['game'] = build_game
 
 # Add appearance mode switcher at bottom of sidebar
 appearance_mode_menu = ctk.CTkOptionMenu(sidebar_frame, 
@@ -521,6 +714,42 @@ appearance_mode_menu.grid(row=10, column=0, padx=20, pady=20, sticky="s")
 # Update navigation and show login initially
 update_navigation()
 show_frame('login')
+mark_startup("login frame")
+
+def report_startup():
+    """Print how long each startup stage took (RPS_STARTUP_REPORT=1).
+
+    Any other value of RPS_STARTUP_REPORT is taken as a file to append the
+    timings to as one JSON line, so time-to-first-frame can be tracked.
+    """
+    mark_startup("first frame")
+    stages = {}
+    previous = STARTUP_BEGIN
+    for stage, timestamp in startup_marks:
+        stages[stage] = round((timestamp - previous) * 1000, 1)
+        previous = timestamp
+    first_frame_ms = round((previous - STARTUP_BEGIN) * 1000, 1)
+    
+    target = os.environ.get("RPS_STARTUP_REPORT")
+    if target == "1":
+        print("Startup time breakdown:")
+        for stage, ms in stages.items():
+            print(f"  {stage:<12} {ms:8.1f} ms")
+        print(f"  {'total':<12} {first_frame_ms:8.1f} ms to first frame")
+    else:
+        with open(target, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"stages_ms": stages, "first_frame_ms": first_frame_ms}) + "\n")
+
+if os.environ.get("RPS_STARTUP_REPORT"):
+    app.after_idle(report_startup)
+
+def handle_exit():
+    # Let an in-flight login or round finish, then flush queued rounds
+    tasks.shutdown()
+    storage.close()
+    app.destroy()
+
+app.protocol("WM_DELETE_WINDOW", handle_exit)
 
 # Run the application
 app.mainloop()
@@ -588,8 +817,11 @@ def create_game_interface():
     
     # Enhanced game logic with animations
     def play_game(choice):
-        computer_choice, result = game.play(choice)
-        
+        # Ignored while the previous round is still being saved
+        tasks.submit('play', game.play, choice,
+                     on_done=lambda outcome: show_result(choice, *outcome))
+
+    def show_result(choice, computer_choice, result):
         if result == 'wins':
             result_color = COLORS['accent']
             emoji = "🎉"
@@ -608,14 +840,18 @@ def create_game_interface():
         score_text = f"🎮 Games: {stats['total_games']} | 🏆 Wins: {stats['wins']} | 📈 Win Rate: {stats['win_rate']}"
         score_label.configure(text=score_text)
         
-        # Get game analytics data
-        analytics_data = {
-            'moves': game.get_move_distribution(),
-            'trend': game.get_winrate_trend()
-        }
-        
         # Update charts if on dashboard
         if 'dashboard' in frames:
+            from data_utils import MAX_TREND_POINTS
+            
+            # Get game analytics data
+            trend_rounds, trend = game.get_winrate_trend(MAX_TREND_POINTS, positions=True)
+            analytics_data = {
+                'moves': game.get_move_distribution(),
+                'trend': trend,
+                'trend_rounds': trend_rounds
+            }
+            
             charts_widget = charts_frame.winfo_children()[0]
             charts_widget.update_charts(analytics_data)
         
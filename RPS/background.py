@@ -0,0 +1,70 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskRunner:
+    """Runs blocking calls on a worker thread and hands results back to Tk.
+
+    Finished calls are queued and polled with widget.after every POLL_MS,
+    so callbacks run on the Tk thread. A call whose key is still running is
+    dropped. on_busy(True/False) is called when work starts and drains.
+    """
+
+    # Polling only while work is in flight; ~60 fps keeps the window repainting
+    POLL_MS = 16
+
+    def __init__(self, widget, workers=1, on_busy=None):
+        self.widget = widget
+        self.on_busy = on_busy
+        # One worker by default keeps rounds in order, and game state is not
+        # meant to be changed from two threads at once
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rps-worker")
+        self._done = queue.Queue()
+        self._in_flight = set()
+        self._polling = False
+
+    def busy(self, key=None):
+        """Whether key (or anything, if key is None) is in flight"""
+        return bool(self._in_flight) if key is None else key in self._in_flight
+
+    def submit(self, key, func, *args, on_done=None, on_error=None):
+        """Run func(*args) on the worker; returns False if key is already running"""
+        if key in self._in_flight:
+            return False
+        if not self._in_flight and self.on_busy is not None:
+            self.on_busy(True)
+        self._in_flight.add(key)
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(lambda f: self._done.put((key, f, on_done, on_error)))
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.POLL_MS, self._poll)
+        return True
+
+    def _poll(self):
+        while True:
+            try:
+                key, future, on_done, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._in_flight.discard(key)
+            error = future.exception()
+            try:
+                if error is None:
+                    if on_done is not None:
+                        on_done(future.result())
+                elif on_error is not None:
+                    on_error(error)
+                else:
+                    self.widget.report_callback_exception(type(error), error, error.__traceback__)
+            finally:
+                if not self._in_flight and self.on_busy is not None:
+                    self.on_busy(False)
+        if self._in_flight:
+            self.widget.after(self.POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def shutdown(self):
+        """Wait for queued work to finish; callbacks for it are not run"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,261 @@
+"""Benchmarks for the game and user hot paths as the data files grow.
+
+For every size (rows per file) a scratch directory is filled with synthetic
+users.xlsx, game_data.xlsx and game_history.xlsx (plus the matching history
+log and SQLite database), and then UserManager.authenticate,
+UserManager.register_user, RPSGame.set_user and RPSGame.play are timed
+against each storage backend. The checkpoint operation plays
+CHECKPOINT_ENTRIES rounds and then checkpoints, so it covers the
+spreadsheet rewrite that single plays only trigger every thousand rounds;
+it is run at most CHECKPOINT_REPEAT times. Nothing here touches Tk.
+
+    python benchmark.py --sizes 1000 10000 --output bench.json
+    python benchmark.py --compare bench.json --output bench-new.json
+
+--compare exits with status 1 when any p50 got slower than --threshold
+times the previous run.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from binary_history import BinaryHistoryLog
+from game_utils import MOVES, OUTCOMES, RESULTS, RPSGame
+from history_log import HistoryLog, HISTORY_COLUMNS
+from storage import ExcelStorage, SQLiteStorage, STATS_COLUMNS, USER_COLUMNS
+from user_utils import UserManager
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+OPERATIONS = ["authenticate", "register_user", "set_user", "play", "checkpoint"]
+# Each checkpoint rewrites the workbooks, which takes minutes at a million rows
+CHECKPOINT_REPEAT = 3
+
+
+def write_xlsx(path, columns, rows):
+    """Stream rows into a workbook without holding a DataFrame in memory"""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(columns)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def synthetic_users(n):
+    created = datetime(2024, 1, 1)
+    for i in range(n):
+        stamp = (created + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S")
+        yield [f"user{i:07d}", f"pw{i}", f"user{i}@example.com", stamp, stamp]
+
+
+def synthetic_stats(n, rng):
+    for i in range(n):
+        moves = [rng.randrange(50) for _ in MOVES]
+        total = sum(moves)
+        yield [f"user{i:07d}", total, rng.randrange(total + 1)] + moves
+
+
+def synthetic_history(n, users, rng):
+    start = datetime(2024, 1, 1)
+    for i in range(n):
+        player, computer = rng.randrange(3), rng.randrange(3)
+        yield [f"user{rng.randrange(users):07d}",
+               (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"),
+               MOVES[player], MOVES[computer], RESULTS[OUTCOMES[player][computer]]]
+
+
+def build_dataset(directory, size, seed=0):
+    """Write every data file for one size into directory"""
+    rng = random.Random(seed)
+    paths = {name: os.path.join(directory, name) for name in
+             ["users.xlsx", "game_data.xlsx", "game_history.xlsx", "game_history.log", "game_history.bin",
+              "rps.db", "rps.journal", "stats_snapshots"]}
+    write_xlsx(paths["users.xlsx"], USER_COLUMNS, synthetic_users(size))
+    write_xlsx(paths["game_data.xlsx"], STATS_COLUMNS, synthetic_stats(size, rng))
+    write_xlsx(paths["game_history.xlsx"], HISTORY_COLUMNS, synthetic_history(size, size, random.Random(seed)))
+
+    # The history log and the database get the same rows as the workbooks
+    with open(paths["game_history.log"], "w", encoding="utf-8") as f:
+        for row in synthetic_history(size, size, random.Random(seed)):
+            f.write(json.dumps(dict(zip(HISTORY_COLUMNS, row)), separators=(",", ":")) + "\n")
+    db = SQLiteStorage(paths["rps.db"])
+    with db.conn:
+        db.conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?)", synthetic_users(size))
+        db.conn.executemany("INSERT INTO stats VALUES (?, ?, ?, ?, ?, ?)", synthetic_stats(size, random.Random(seed)))
+        db.conn.executemany(
+            "INSERT INTO history (username, datetime, player, computer, result) VALUES (?, ?, ?, ?, ?)",
+            synthetic_history(size, size, random.Random(seed)))
+    db.close()
+    return paths
+
+
+def open_backend(backend, paths):
+    if backend == "sqlite":
+        return SQLiteStorage(paths["rps.db"])
+    if backend == "binary":
+        # Imported from the history log the first time it is opened
+        history_log = BinaryHistoryLog(paths["game_history.bin"], legacy_log=paths["game_history.log"],
+                                       legacy_path=None)
+    else:
+        history_log = HistoryLog(paths["game_history.log"], legacy_path=None)
+    return ExcelStorage(users_path=paths["users.xlsx"], data_path=paths["game_data.xlsx"],
+                        history_log=history_log,
+                        journal_path=paths["rps.journal"], snapshot_dir=paths["stats_snapshots"])
+
+
+def operation_calls(operation, storage, size, rng):
+    """Return a callable performing one operation, with any setup done"""
+    existing = lambda: f"user{rng.randrange(size):07d}"
+    if operation == "authenticate":
+        users = UserManager(storage=storage)
+
+        def authenticate():
+            i = rng.randrange(size)
+            return users.authenticate(f"user{i:07d}", f"pw{i}")
+        return authenticate
+    if operation == "register_user":
+        users = UserManager(storage=storage)
+        counter = iter(range(10 ** 9))
+        return lambda: users.register_user(f"bench{next(counter)}-{rng.random()}", "pw", "bench@example.com")
+    if operation == "set_user":
+        game = RPSGame(storage)
+        # Include loading the newest page of history, as the GUI does
+        return lambda: (game.set_user(existing()), game.game_history.recent(50))
+    if operation == "play":
+        game = RPSGame(storage)
+        game.set_user(existing())
+        return lambda: game.play(rng.choice(MOVES))
+    if operation == "checkpoint":
+        game = RPSGame(storage)
+        game.set_user(existing())
+        # SQLiteStorage has nothing to fold, so there it is the batch alone
+        checkpoint = getattr(storage, "checkpoint", storage.flush)
+
+        def play_and_checkpoint():
+            game.play_many([rng.choice(MOVES) for _ in range(ExcelStorage.CHECKPOINT_ENTRIES)])
+            checkpoint()
+        return play_and_checkpoint
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def measure(call, repeat):
+    """Time repeat calls, then one more under tracemalloc for peak memory"""
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "first_ms": round(samples[0], 3),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p90_ms": round(percentile(samples, 90), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "max_ms": round(max(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "peak_kb": round(peak / 1024, 1),
+        "samples": len(samples),
+    }
+
+
+def run(sizes, backends, operations, repeat, seed=0, log=print):
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix=f"rps-bench-{size}-") as directory:
+            started = time.perf_counter()
+            paths = build_dataset(directory, size, seed)
+            log(f"[{size:>8} rows] dataset built in {time.perf_counter() - started:.1f}s")
+            for backend in backends:
+                for operation in operations:
+                    storage = open_backend(backend, paths)
+                    try:
+                        call = operation_calls(operation, storage, size, random.Random(seed))
+                        calls = min(repeat, CHECKPOINT_REPEAT) if operation == "checkpoint" else repeat
+                        stats = measure(call, calls)
+                    finally:
+                        storage.close()
+                    row = {"size": size, "backend": backend, "operation": operation, **stats}
+                    results.append(row)
+                    log(f"[{size:>8} rows] {backend:<6} {operation:<14} p50 {stats['p50_ms']:>10.3f} ms  "
+                        f"p99 {stats['p99_ms']:>10.3f} ms  peak {stats['peak_kb']:>10.1f} KB")
+    return results
+
+
+def compare(previous, current, threshold):
+    """Print p50 ratios against an earlier run; return the regressions"""
+    key = lambda r: (r["size"], r["backend"], r["operation"])
+    before = {key(r): r for r in previous["results"]}
+    regressions = []
+    for row in current["results"]:
+        old = before.get(key(row))
+        if old is None or old["p50_ms"] == 0:
+            continue
+        ratio = row["p50_ms"] / old["p50_ms"]
+        flag = "REGRESSION" if ratio > threshold else ""
+        print(f"{row['size']:>8} {row['backend']:<6} {row['operation']:<14} "
+              f"{old['p50_ms']:>10.3f} -> {row['p50_ms']:>10.3f} ms  x{ratio:5.2f} {flag}")
+        if flag:
+            regressions.append(row)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RPS hot paths against growing data files")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Rows per data file")
+    parser.add_argument("--backends", nargs="+", default=["excel", "sqlite"], choices=["excel", "binary", "sqlite"])
+    parser.add_argument("--operations", nargs="+", default=OPERATIONS, choices=OPERATIONS)
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="p50 slowdown ratio that counts as a regression")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.backends, args.operations, args.repeat, args.seed)
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sqlite": sqlite3.sqlite_version,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        if compare(previous, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
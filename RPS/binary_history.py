@@ -0,0 +1,328 @@
+import json
+import os
+import threading
+import numpy as np
+from game_utils import MOVES, MOVE_CODES, RESULTS, RESULT_CODES, from_epoch, to_epoch
+from history_log import HistoryLog, HISTORY_COLUMNS
+
+MAGIC = b"RPSHIST\0"
+VERSION = 1
+HEADER_SIZE = 16
+# One round: epoch seconds, user id, then move/result codes (indexes into
+# MOVES and RESULTS), padded to 16 bytes so records stay aligned
+RECORD_DTYPE = np.dtype({
+    'names': ['time', 'user', 'player', 'computer', 'result'],
+    'formats': ['<i8', '<u4', 'i1', 'i1', 'i1'],
+    'offsets': [0, 8, 12, 13, 14],
+    'itemsize': 16,
+})
+RECORD_SIZE = RECORD_DTYPE.itemsize
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u2'), ('record_size', '<u2'), ('reserved', '<u4')])
+
+
+class BinaryHistoryLog:
+    """Game history as fixed-width binary records, a drop-in for HistoryLog.
+
+    Usernames live in a sidecar file (path + ".users", one JSON string per
+    line) whose line number is the user id. Offsets are byte offsets, as
+    with HistoryLog.
+    """
+
+    FORMAT = "binary"
+    # Records decoded to dicts per step when scanning
+    CHUNK_RECORDS = 65536
+
+    def __init__(self, path="game_history.bin", legacy_log="game_history.log",
+                 legacy_path="game_history.xlsx"):
+        self.path = path
+        self.users_path = path + ".users"
+        self._file = None
+        self._users_file = None
+        self.legacy_log = legacy_log
+        self.legacy_path = legacy_path
+        self._names = []
+        self._ids = {}
+        self._users_size = 0
+        # iter_history decodes outside the storage lock while others append
+        self._users_lock = threading.RLock()
+
+    def recover(self, size=None):
+        """Get the file ready for appending, as HistoryLog.recover: create
+        it from the text log or the old spreadsheet if it is missing, then
+        cut it back to size or to the last whole record. Callers sharing the
+        file hold the storage lock.
+        """
+        if not os.path.exists(self.path):
+            self._import_legacy(self.legacy_log, self.legacy_path)
+        self._check_header()
+        if size is not None and self.end_offset() > size:
+            self.truncate(size)
+        elif (os.path.getsize(self.path) - HEADER_SIZE) % RECORD_SIZE:
+            # A crash mid-write leaves a partial last record behind
+            self.compact()
+        self._refresh_users()
+
+    def _check_header(self):
+        with open(self.path, "rb") as f:
+            data = f.read(HEADER_SIZE)
+        if len(data) != HEADER_SIZE or data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a binary history file")
+        header = np.frombuffer(data, dtype=HEADER_DTYPE)
+        if header['version'][0] != VERSION or header['record_size'][0] != RECORD_SIZE:
+            raise ValueError(f"{self.path} has an unsupported record layout")
+
+    @staticmethod
+    def _header():
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header['magic'] = MAGIC
+        header['version'] = VERSION
+        header['record_size'] = RECORD_SIZE
+        return header.tobytes()
+
+    def _import_legacy(self, legacy_log, legacy_path):
+        """Create the file, copying rounds from the text log or the spreadsheet"""
+        if legacy_log and os.path.exists(legacy_log):
+            records = HistoryLog(legacy_log, legacy_path=None).records()
+        elif legacy_path and os.path.exists(legacy_path):
+            import pandas as pd
+            records = iter(pd.read_excel(legacy_path).astype(str).to_dict("records"))
+        else:
+            records = iter(())
+
+        # No records refer to an old sidecar while the file does not exist
+        if os.path.exists(self.users_path):
+            os.remove(self.users_path)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._header())
+            while True:
+                chunk = []
+                for record in records:
+                    try:
+                        chunk.append(self._row(record))
+                    except (KeyError, ValueError, TypeError):
+                        continue
+                    if len(chunk) == self.CHUNK_RECORDS:
+                        break
+                if not chunk:
+                    break
+                f.write(np.array(chunk, dtype=RECORD_DTYPE).tobytes())
+        self.sync()
+        self._close_users()
+        os.replace(tmp_path, self.path)
+
+    def _refresh_users(self):
+        """Pick up names added since the last look, by this or another process"""
+        if not os.path.exists(self.users_path):
+            return
+        with self._users_lock:
+            if self._users_file is not None:
+                self._users_file.flush()
+            with open(self.users_path, "rb") as f:
+                f.seek(self._users_size)
+                data = f.read()
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                name = json.loads(line)
+                self._ids.setdefault(name, len(self._names))
+                self._names.append(name)
+            self._users_size += end
+
+    def _user_id(self, username):
+        """username's id, adding it to the sidecar if it is new"""
+        user_id = self._ids.get(username)
+        if user_id is not None:
+            return user_id
+        with self._users_lock:
+            self._refresh_users()
+            user_id = self._ids.get(username)
+            if user_id is None:
+                if self._users_file is None:
+                    self._users_file = open(self.users_path, "ab")
+                line = (json.dumps(username) + "\n").encode("utf-8")
+                self._users_file.write(line)
+                self._users_file.flush()
+                user_id = self._ids[username] = len(self._names)
+                self._names.append(username)
+                self._users_size += len(line)
+        return user_id
+
+    def _row(self, record):
+        # Codes first, so a bad record does not leave a name behind
+        codes = (MOVE_CODES[record["player"].lower()], MOVE_CODES[record["computer"].lower()],
+                 RESULT_CODES[record["result"]])
+        return (to_epoch(record["datetime"]), self._user_id(str(record["username"]))) + codes
+
+    def _name(self, user_id):
+        if user_id >= len(self._names):
+            self._refresh_users()
+        return self._names[user_id] if user_id < len(self._names) else None
+
+    def _decode(self, block):
+        """Record dicts for an array of records, None for any it cannot name"""
+        records = []
+        for t, user_id, player, computer, result in zip(
+                block['time'].tolist(), block['user'].tolist(), block['player'].tolist(),
+                block['computer'].tolist(), block['result'].tolist()):
+            name = self._name(user_id)
+            if name is None:
+                records.append(None)
+                continue
+            records.append({
+                "username": name,
+                "datetime": from_epoch(t),
+                "player": MOVES[player],
+                "computer": MOVES[computer],
+                "result": RESULTS[result]
+            })
+        return records
+
+    @staticmethod
+    def record_size(record):
+        """Bytes record takes in the file"""
+        return RECORD_SIZE
+
+    @staticmethod
+    def _index(offset):
+        return max(offset - HEADER_SIZE, 0) // RECORD_SIZE
+
+    def append(self, record):
+        """Append a single round to the end of the file"""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Append a batch of rounds with a single write"""
+        if not records:
+            return
+        rows = np.array([self._row(record) for record in records], dtype=RECORD_DTYPE)
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(rows.tobytes())
+        self._file.flush()
+
+    def columns(self, end=None):
+        """Every record up to byte offset end as a read-only structured array.
+
+        The array is a numpy.memmap over the file, so fields and slices are
+        views that cost nothing until read. Map it again after appending to
+        see new rounds, and drop it before truncating on Windows.
+        """
+        count = self._index(self.end_offset() if end is None else min(end, self.end_offset()))
+        if count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+    def user_id(self, username):
+        """username's id in the user column, or None if they have no rounds"""
+        if username not in self._ids:
+            self._refresh_users()
+        return self._ids.get(username)
+
+    def results(self, username, end=None):
+        """username's result codes, one byte per round, up to byte offset end"""
+        user_id = self.user_id(username)
+        if user_id is None:
+            return b""
+        view = self.columns(end)
+        return view['result'][view['user'] == user_id].tobytes()
+
+    def __iter__(self):
+        """Iterate over every record in the file, oldest first"""
+        return self.records()
+
+    def records(self, end=None, start=0):
+        """Iterate over the records between byte offsets start and end"""
+        for _, record in self.scan(start, end):
+            yield record
+
+    def scan(self, start=0, end=None):
+        """Iterate over (offset, record) for records that start at or after
+        start and end by end. start must be the beginning of a record.
+        """
+        view = self.columns(end)
+        for first in range(self._index(start), len(view), self.CHUNK_RECORDS):
+            block = view[first:first + self.CHUNK_RECORDS]
+            offset = HEADER_SIZE + first * RECORD_SIZE
+            for i, record in enumerate(self._decode(block)):
+                if record is not None:
+                    yield offset + i * RECORD_SIZE, record
+
+    def read(self, username, end=None):
+        """Return all rounds played by username, oldest first"""
+        user_id = self.user_id(username)
+        if user_id is None:
+            return []
+        view = self.columns(end)
+        return [record for record in self._decode(view[view['user'] == user_id]) if record is not None]
+
+    def end_offset(self):
+        """Byte offset just past the last record, usable as a page cursor"""
+        if self._file is not None:
+            self._file.flush()
+        size = os.path.getsize(self.path)
+        return size - (size - HEADER_SIZE) % RECORD_SIZE
+
+    def read_page(self, username, before=None, limit=50, block_size=65536):
+        """Return up to limit of username's rounds that start before byte offset before.
+
+        Records come back newest first with the cursor for the next page,
+        or None once the start of the file is reached, as HistoryLog does.
+        The user column is searched backwards block_size records at a time.
+        """
+        user_id = self.user_id(username)
+        if user_id is None or limit <= 0:
+            return [], None
+        view = self.columns(before)
+        records = []
+        cursor = None
+        stop = len(view)
+        while stop > 0 and len(records) < limit:
+            first = max(stop - block_size, 0)
+            hits = np.flatnonzero(view['user'][first:stop] == user_id)[::-1][:limit - len(records)]
+            if len(hits):
+                records += [record for record in self._decode(view[first + hits]) if record is not None]
+                cursor = HEADER_SIZE + (first + int(hits[-1])) * RECORD_SIZE
+            stop = first
+        if len(records) < limit or cursor == HEADER_SIZE:
+            cursor = None
+        return records, cursor
+
+    def sync(self):
+        """Force appended rounds, and the names they use, onto the disk"""
+        # Names first: a crash may leave unused names, never a nameless record
+        if self._users_file is not None:
+            self._users_file.flush()
+            os.fsync(self._users_file.fileno())
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def truncate(self, size):
+        """Cut the file back to size bytes, dropping everything after it"""
+        self.close()
+        os.truncate(self.path, max(size, HEADER_SIZE))
+
+    def compact(self):
+        """Drop a partial record left at the end by an interrupted write"""
+        self.truncate(self.end_offset())
+        return self._index(self.end_offset())
+
+    def export_xlsx(self, path="game_history.xlsx"):
+        """Write the whole file out as a spreadsheet"""
+        import pandas as pd
+        df = pd.DataFrame(list(self), columns=HISTORY_COLUMNS)
+        df.to_excel(path, index=False)
+        return len(df)
+
+    def _close_users(self):
+        with self._users_lock:
+            if self._users_file is not None:
+                self._users_file.close()
+                self._users_file = None
+
+    def close(self):
+        """Close the append handles"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._close_users()
@@ -1,49 +1,110 @@
+import math
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from metrics import timed
+
+# Upper bound on points drawn in the win rate trend, whatever the game count
+MAX_TREND_POINTS = 500
+
+# Matplotlib's pie defaults, reused when repositioning labels by hand
+LABEL_DISTANCE = 1.1
+PCT_DISTANCE = 0.6
 
 def create_charts(parent_frame):
     # Create a figure with a dark background
     fig = plt.figure(figsize=(12, 4), facecolor='#2B2B2B')
-    
+
     # Add subplots
     moves_ax = plt.subplot(121)
     trend_ax = plt.subplot(122)
-    
+
     # Sample data (will be replaced by actual game data)
     moves_data = {'Rock': 0, 'Paper': 0, 'Scissors': 0}
     trend_data = [0]  # Win rate over time
-    
+
+    # Build the artists once; later updates only change their data
+    wedges, labels, pct_labels = moves_ax.pie(
+        [1] * len(moves_data), labels=moves_data.keys(), autopct='%1.1f%%',
+        colors=['#1F538D', '#3B8ED0', '#28A745'])
+    moves_ax.set_title('Move Distribution', color='white', pad=20)
+
+    trend_line, = trend_ax.plot(trend_data, color='#3B8ED0', linewidth=2)
+    trend_ax.set_title('Win Rate Trend', color='white', pad=20)
+    trend_ax.set_ylim(0, 100)
+    trend_ax.grid(True, alpha=0.2)
+
+    # Style adjustments
+    for ax in [moves_ax, trend_ax]:
+        ax.set_facecolor('#2B2B2B')
+
+    def update_pie(moves):
+        total = sum(moves.values())
+        theta1 = 0.0
+        for wedge, label, pct_label, (name, count) in zip(wedges, labels, pct_labels, moves.items()):
+            frac = count / total if total else 0.0
+            theta2 = theta1 + 360.0 * frac
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+
+            # Same placement matplotlib uses when it builds the pie
+            angle = math.radians((theta1 + theta2) / 2)
+            x, y = math.cos(angle), math.sin(angle)
+            label.set_text(name)
+            label.set_position((LABEL_DISTANCE * x, LABEL_DISTANCE * y))
+            label.set_horizontalalignment('right' if x < 0 else 'left')
+            pct_label.set_text(f"{frac * 100:.1f}%")
+            pct_label.set_position((PCT_DISTANCE * x, PCT_DISTANCE * y))
+
+            visible = frac > 0
+            for artist in (wedge, label, pct_label):
+                artist.set_visible(visible)
+            theta1 = theta2
+
+    # Start empty until the first round is played
+    update_pie(moves_data)
+
+    # Layout is only recomputed when the widget is resized
+    state = {'needs_layout': True, 'layout_pending': False}
+
+    @timed("ui.chart_update")
     def update_charts(game_data):
-        # Clear previous plots
-        moves_ax.clear()
-        trend_ax.clear()
-        
         # Update moves distribution chart
-        moves = game_data['moves']
-        moves_ax.pie(moves.values(), labels=moves.keys(), autopct='%1.1f%%',
-                    colors=['#1F538D', '#3B8ED0', '#28A745'])
-        moves_ax.set_title('Move Distribution', color='white', pad=20)
-        
+        update_pie(game_data['moves'])
+
         # Update win rate trend
+        # Downsampled points are plotted at the round they came from
         trend = game_data['trend']
-        trend_ax.plot(trend, color='#3B8ED0', linewidth=2)
-        trend_ax.set_title('Win Rate Trend', color='white', pad=20)
-        trend_ax.set_ylim(0, 100)
-        trend_ax.grid(True, alpha=0.2)
-        trend_ax.set_facecolor('#2B2B2B')
-        
-        # Style adjustments
-        for ax in [moves_ax, trend_ax]:
-            ax.set_facecolor('#2B2B2B')
-            
+        rounds = game_data.get('trend_rounds', range(len(trend)))
+        trend_line.set_data(rounds, trend)
+        trend_ax.set_xlim(0, max(rounds[-1] if len(rounds) else 0, 1))
+
+        if state['needs_layout']:
+            fig.tight_layout()
+            state['needs_layout'] = False
+
+        # Coalesces rapid updates into a single render when Tk is idle
+        canvas.draw_idle()
+
+    def relayout():
+        state['layout_pending'] = False
         fig.tight_layout()
-        canvas.draw()
-    
+        state['needs_layout'] = False
+        canvas.draw_idle()
+
+    def on_resize(event):
+        state['needs_layout'] = True
+        if not state['layout_pending']:
+            state['layout_pending'] = True
+            widget.after_idle(relayout)
+
     # Create canvas
     canvas = FigureCanvasTkAgg(fig, master=parent_frame)
+    # The actual render happens later, when Tk is idle; time it there
+    canvas.draw = timed("ui.chart_draw")(canvas.draw)
     widget = canvas.get_tk_widget()
-    
+    widget.bind("<Configure>", on_resize, add="+")
+
     # Store update function as attribute
     widget.update_charts = update_charts
-    
+
     return widget
@@ -0,0 +1,134 @@
+"""Stream game history out of the store to CSV or Parquet.
+
+Records are read and written in fixed-size chunks, and the output has no
+row limit. The file is written under a temporary name and renamed when
+complete, so a nightly job never picks up a half-written export.
+
+    python export.py history.csv
+    python export.py history.parquet --storage sqlite --since 2024-01-01
+    python export.py sonali.csv --user sonali --until 2024-06-30
+
+Parquet needs pyarrow (pip install pyarrow); CSV has no extra requirements.
+"""
+import argparse
+import csv
+import os
+import time
+from itertools import islice
+from history_log import HISTORY_COLUMNS
+
+FORMATS = ["csv", "parquet"]
+
+
+def matches(record, username=None, since=None, until=None):
+    """Whether a record passes the filters. Dates compare as text, so
+    since/until may be a day (YYYY-MM-DD) or a full timestamp; until is
+    inclusive either way.
+    """
+    if username is not None and record["username"] != username:
+        return False
+    stamp = record["datetime"]
+    if since is not None and stamp < since:
+        return False
+    if until is not None and stamp[:len(until)] > until:
+        return False
+    return True
+
+
+def chunks(records, size):
+    """Group an iterator of records into lists of at most size"""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class CSVWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(HISTORY_COLUMNS)
+
+    def write(self, chunk):
+        self._writer.writerows([record[c] for c in HISTORY_COLUMNS] for record in chunk)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """One row group per chunk, with the timestamp as a real timestamp column"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        self._pa = pa
+        self._schema = pa.schema([(c, pa.timestamp("s") if c == "datetime" else pa.string())
+                                  for c in HISTORY_COLUMNS])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="snappy")
+
+    def write(self, chunk):
+        pa = self._pa
+        columns = {c: [record[c] for record in chunk] for c in HISTORY_COLUMNS}
+        columns["datetime"] = pa.array(columns["datetime"], pa.string()).cast(pa.timestamp("s"))
+        self._writer.write_table(pa.table(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {"csv": CSVWriter, "parquet": ParquetWriter}
+
+
+def export(storage, path, fmt=None, username=None, since=None, until=None, chunk_size=50000):
+    """Write the matching history records to path, returning the row count"""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt} (use one of {', '.join(FORMATS)})")
+
+    records = (r for r in storage.iter_history() if matches(r, username, since, until))
+    tmp_path = path + ".tmp"
+    writer = WRITERS[fmt](tmp_path)
+    rows = 0
+    try:
+        for chunk in chunks(records, chunk_size):
+            writer.write(chunk)
+            rows += len(chunk)
+    except BaseException:
+        writer.close()
+        os.remove(tmp_path)
+        raise
+    writer.close()
+    os.replace(tmp_path, path)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export RPS game history to CSV or Parquet")
+    parser.add_argument("output", help="File to write; the format follows the extension")
+    parser.add_argument("--format", choices=FORMATS, help="Override the format")
+    parser.add_argument("--storage", default="excel", help="Storage backend: excel, binary or sqlite")
+    parser.add_argument("--user", help="Only this user's rounds")
+    parser.add_argument("--since", help="First day or timestamp to include (YYYY-MM-DD[ HH:MM:SS])")
+    parser.add_argument("--until", help="Last day or timestamp to include")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Records per write")
+    args = parser.parse_args()
+
+    from storage import open_storage
+    storage = open_storage(args.storage)
+    started = time.perf_counter()
+    try:
+        rows = export(storage, args.output, args.format, args.user, args.since, args.until, args.chunk_size)
+    finally:
+        storage.close()
+    elapsed = time.perf_counter() - started
+    print(f"Exported {rows} rounds to {args.output} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
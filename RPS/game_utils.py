@@ -1,129 +1,398 @@
+import calendar
 import random
+import sys
+import time
+from array import array
 from datetime import datetime
-import pandas as pd
-import os
+from metrics import count, timed, timer
+from storage import ExcelStorage
+
+# Moves and results encoded as small integers: OUTCOMES[player][computer]
+# indexes RESULTS, which is the same as (player - computer) % 3
+MOVES = ['rock', 'paper', 'scissors']
+RESULTS = ['ties', 'wins', 'losses']
+OUTCOMES = [
+    [0, 2, 1],
+    [1, 0, 2],
+    [2, 1, 0]
+]
+MOVE_CODES = {move: code for code, move in enumerate(MOVES)}
+RESULT_CODES = {result: code for code, result in enumerate(RESULTS)}
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def downsample_minmax(values, max_points):
+    """Reduce a series to at most max_points, keeping each bucket's min and max.
+
+    The series is split into at most max_points // 2 equal buckets and each bucket
+    contributes its lowest and highest value in their original order, so
+    spikes survive while the number of plotted points stays bounded.
+    Returns (indexes into values, values) of the points kept; with room for
+    a single point, that is the last one.
+    """
+    import numpy as np
+    values = np.asarray(values)
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n), values
+    if max_points < 2:
+        keep = np.arange(n - 1, n) if max_points == 1 else np.arange(0)
+        return keep, values[keep]
+    buckets = max_points // 2
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    # Pad the last bucket with its final value so the series reshapes evenly
+    padded = np.empty(buckets * size, dtype=values.dtype)
+    padded[:n] = values
+    padded[n:] = values[-1]
+    grid = padded.reshape(buckets, size)
+    lo = grid.argmin(axis=1)
+    hi = grid.argmax(axis=1)
+    positions = np.empty((buckets, 2), dtype=np.int64)
+    positions[:, 0] = np.minimum(lo, hi)
+    positions[:, 1] = np.maximum(lo, hi)
+    # Back to indexes into values; padding repeats the last value, so any
+    # pick past the end is that value
+    positions = np.minimum(positions + (np.arange(buckets) * size)[:, None], n - 1).ravel()
+    return positions, values[positions]
+
+
+def to_epoch(timestamp):
+    """'YYYY-MM-DD HH:MM:SS' as integer seconds, taking the wall clock as UTC"""
+    s = str(timestamp)
+    try:
+        # Fixed-width fast path; strptime is several times slower
+        return calendar.timegm((int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                                int(s[11:13]), int(s[14:16]), int(s[17:19])))
+    except ValueError:
+        return calendar.timegm(time.strptime(s[:19], TIME_FORMAT))
+
+
+def from_epoch(seconds):
+    return time.strftime(TIME_FORMAT, time.gmtime(seconds))
+
+
+class ColumnarHistory:
+    """A user's rounds stored as columns instead of one dict per round.
+
+    Moves and results are int8 codes (indexes into MOVES and RESULTS), times
+    are int64 epoch seconds and the username is one interned string, so a
+    round takes 11 bytes. Record dicts are only built when indexed, e.g. for
+    the rows on screen, and columns() hands the data to NumPy without copying.
+    """
+
+    # Column name -> (array typecode, NumPy dtype)
+    COLUMNS = {
+        'player': ('b', 'int8'),
+        'computer': ('b', 'int8'),
+        'result': ('b', 'int8'),
+        'time': ('q', 'int64'),
+    }
+
+    def __init__(self, username):
+        self.username = sys.intern(username)
+        for name, (typecode, _) in self.COLUMNS.items():
+            setattr(self, name, array(typecode))
+
+    def append(self, record):
+        self.player.append(MOVE_CODES[record['player'].lower()])
+        self.computer.append(MOVE_CODES[record['computer'].lower()])
+        self.result.append(RESULT_CODES[record['result']])
+        self.time.append(to_epoch(record['datetime']))
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return len(self.player)
+
+    def record(self, index):
+        """Round index as a history record dict"""
+        return {
+            'username': self.username,
+            'datetime': from_epoch(self.time[index]),
+            'player': MOVES[self.player[index]],
+            'computer': MOVES[self.computer[index]],
+            'result': RESULTS[self.result[index]]
+        }
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            part = ColumnarHistory(self.username)
+            for name in self.COLUMNS:
+                setattr(part, name, getattr(self, name)[index])
+            return part
+        return self.record(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.record(i)
+
+    def columns(self):
+        """The columns as NumPy arrays sharing this history's memory.
+
+        They are only valid until the next append, which may move the buffers.
+        """
+        import numpy as np
+        return {name: np.frombuffer(getattr(self, name), dtype=dtype)
+                for name, (_, dtype) in self.COLUMNS.items()}
+
+
+class PagedHistory:
+    """One user's game history, loaded lazily a page at a time, newest first.
+
+    Nothing is read until a record is asked for. Pages are fetched from
+    storage on demand, starting from the newest stored round, and rounds
+    played during this session are kept in memory in front of them. Both
+    are held as ColumnarHistory; records come out as dicts.
+
+    A read that needs many pages fetches them all in one storage call.
+    fetch() and add() split a load in two, so the storage call can run on
+    a worker thread and the records be added on the thread that reads them.
+    """
+
+    def __init__(self, storage, username, page_size=50):
+        self.storage = storage
+        self.username = username
+        self.page_size = page_size
+        self._cursor = storage.history_cursor()
+        self._older = ColumnarHistory(username)  # Loaded from storage, newest first
+        self._newer = ColumnarHistory(username)  # Played this session, oldest first
+        self._exhausted = False
+
+    def append(self, record):
+        self._newer.append(record)
+
+    def extend(self, records):
+        self._newer.extend(records)
+
+    def load_more(self):
+        """Load the next older page. Returns the number of records loaded"""
+        return self.load_to(self.loaded_count() + self.page_size)
+
+    def load_to(self, count):
+        """Load until count records are loaded or storage has no more.
+        Returns the number of records loaded"""
+        if self._exhausted or self.loaded_count() >= count:
+            return 0
+        return self.add(self.fetch(count - self.loaded_count()))
+
+    def fetch(self, n):
+        """Read at least n older records (a page at the least) from storage
+        without adding them, for add()"""
+        if self._exhausted:
+            return self._cursor, [], None
+        records, cursor = self.storage.load_history_page(
+            self.username, self._cursor, max(n, self.page_size))
+        return self._cursor, records, cursor
+
+    def add(self, fetched):
+        """Add records from fetch(), unless others were added since.
+        Returns the number added"""
+        start, records, cursor = fetched
+        if start != self._cursor or self._exhausted:
+            return 0
+        self._older.extend(records)
+        self._cursor = cursor
+        if cursor is None:
+            self._exhausted = True
+        return len(records)
+
+    def has_more(self):
+        """Whether older pages may still be waiting in storage"""
+        return not self._exhausted
+
+    def loaded_count(self):
+        return len(self._newer) + len(self._older)
+
+    def get(self, start, stop):
+        """Records start..stop counting back from the newest, loading pages as needed"""
+        self.load_to(stop)
+        return self.peek(start, stop)
+
+    def peek(self, start, stop):
+        """Like get, but only from the records already loaded"""
+        n = len(self._newer)
+        newest_first = [self._newer.record(n - 1 - i) for i in range(start, min(stop, n))]
+        if stop > n:
+            newest_first += list(self._older[max(start - n, 0):stop - n])
+        return newest_first
+
+    def recent(self, n):
+        """The n most recent records, newest first"""
+        return self.get(0, n)
+
+    def recent_columns(self, n):
+        """Columns of the n most recent rounds as NumPy arrays, oldest first"""
+        import numpy as np
+        self.load_to(n)
+        newer = self._newer.columns()
+        older = self._older.columns()
+        take_new = min(n, len(self._newer))
+        take_old = min(n - take_new, len(self._older))
+        return {name: np.concatenate([older[name][:take_old][::-1],
+                                      newer[name][len(self._newer) - take_new:]])
+                for name in ColumnarHistory.COLUMNS}
+
+    def __iter__(self):
+        """Iterate newest first over the full history, loading as it goes"""
+        index = 0
+        while True:
+            page = self.get(index, index + self.page_size)
+            if not page:
+                return
+            yield from page
+            index += len(page)
+
 
 class RPSGame:
-    def __init__(self):
+    # How many of a user's most recent rounds an adaptive opponent learns from at login
+    WARM_START_ROUNDS = 5000
+
+    def __init__(self, storage=None, opponent=None, leaderboard=None):
         self.game_history = []
         self.move_counts = {'rock': 0, 'paper': 0, 'scissors': 0}
-        self.win_rates = [0]  # Initialize with 0
+        self.win_rates = array('f', [0])  # Initialize with 0
         self.wins = 0
         self.total_games = 0
         self.current_user = None
-        self.data_file = "game_data.xlsx"
-        
-        # Create data file if it doesn't exist
-        if not os.path.exists(self.data_file):
-            df = pd.DataFrame(columns=["username", "total_games", "wins", "rock", "paper", "scissors"])
-            df.to_excel(self.data_file, index=False)
-        
-        # Create history file if it doesn't exist
-        if not os.path.exists("game_history.xlsx"):
-            df = pd.DataFrame(columns=["username", "datetime", "player", "computer", "result"])
-            df.to_excel("game_history.xlsx", index=False)
+        self.storage = storage if storage is not None else ExcelStorage()
+        # Optional adaptive computer player (see strategies.make_opponent);
+        # None keeps the uniformly random computer
+        self.opponent = opponent
+        # Global rankings to keep up to date as rounds are played, if any
+        self.leaderboard = leaderboard
 
+    @timed("game.set_user")
     def set_user(self, username):
         """Set the current user and load their stats"""
         self.current_user = username
         
-        # Load user stats from Excel
-        df = pd.read_excel(self.data_file)
-        user_row = df[df["username"] == username]
+        # Load user stats
+        stats = self.storage.get_stats(username)
         
-        if len(user_row) > 0:
-            self.total_games = user_row["total_games"].values[0]
-            self.wins = user_row["wins"].values[0]
-            self.move_counts["rock"] = user_row["rock"].values[0]
-            self.move_counts["paper"] = user_row["paper"].values[0]
-            self.move_counts["scissors"] = user_row["scissors"].values[0]
+        if stats is not None:
+            self.total_games = stats["total_games"]
+            self.wins = stats["wins"]
+            self.move_counts["rock"] = stats["rock"]
+            self.move_counts["paper"] = stats["paper"]
+            self.move_counts["scissors"] = stats["scissors"]
             
-            # Calculate win rate
-            if self.total_games > 0:
-                win_rate = (self.wins / self.total_games) * 100
-                self.win_rates = [0, win_rate]  # Simplified trend
+            # Rebuild the win rate after every round from the stored results
+            self.win_rates = self._winrate_trend(self.storage.load_results(username))
+            if len(self.win_rates) == 1 and self.total_games > 0:
+                # Stats without history (e.g. older data files): two points
+                self.win_rates.append(self.wins / self.total_games * 100)
         else:
             # New user, initialize stats
             self.total_games = 0
             self.wins = 0
             self.move_counts = {'rock': 0, 'paper': 0, 'scissors': 0}
-            self.win_rates = [0]
-            
-            # Add user to dataframe
-            new_user = {
-                "username": username,
-                "total_games": 0,
-                "wins": 0,
-                "rock": 0,
-                "paper": 0,
-                "scissors": 0
-            }
-            df = pd.concat([df, pd.DataFrame([new_user])], ignore_index=True)
-            df.to_excel(self.data_file, index=False)
+            self.win_rates = array('f', [0])
+            self.storage.create_stats(username)
         
-        # Load user history
-        history_df = pd.read_excel("game_history.xlsx")
-        self.game_history = history_df[history_df["username"] == username].to_dict("records")
+        # History is read lazily, a page at a time, when it is first needed
+        self.game_history = PagedHistory(self.storage, username)
+        
+        # Teach the adaptive opponent this player's recent habits in one pass
+        if self.opponent is not None:
+            self.opponent.reset()
+            recent = self.game_history.recent_columns(self.WARM_START_ROUNDS)
+            self.opponent.warm_start(recent['player'])
 
+    @timed("game.play")
     def play(self, player_choice):
-        """Play a round and save results to Excel"""
+        """Play a round and save results to storage"""
         if not self.current_user:
             return None, None
-            
-        choices = ['rock', 'paper', 'scissors']
-        computer_choice = random.choice(choices)
-        
-        # Update move counts
-        self.move_counts[player_choice.lower()] += 1
-        
-        # Determine winner
-        if player_choice == computer_choice:
-            result = 'ties'
-        elif (
-            (player_choice == 'rock' and computer_choice == 'scissors') or
-            (player_choice == 'paper' and computer_choice == 'rock') or
-            (player_choice == 'scissors' and computer_choice == 'paper')
-        ):
-            result = 'wins'
-            self.wins += 1
-        else:
-            result = 'losses'
-        
-        self.total_games += 1
-        
-        # Calculate and store win rate
-        win_rate = (self.wins / self.total_games) * 100 if self.total_games > 0 else 0
-        self.win_rates.append(win_rate)
-        
-        # Record game in history
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Update Excel data
-        # 1. Update user stats
-        df = pd.read_excel(self.data_file)
-        df.loc[df["username"] == self.current_user, "total_games"] = self.total_games
-        df.loc[df["username"] == self.current_user, "wins"] = self.wins
-        df.loc[df["username"] == self.current_user, "rock"] = self.move_counts["rock"]
-        df.loc[df["username"] == self.current_user, "paper"] = self.move_counts["paper"]
-        df.loc[df["username"] == self.current_user, "scissors"] = self.move_counts["scissors"]
-        df.to_excel(self.data_file, index=False)
-        
-        # 2. Add to history
-        history_df = pd.read_excel("game_history.xlsx")
-        new_record = {
+        return self.play_many([player_choice])[0]
+
+    @timed("game.play_many")
+    def play_many(self, choices):
+        """Play a sequence of rounds and save them to storage in one write.
+
+        Returns (computer_choice, result) for each round, in order. Every
+        choice is checked before anything is played, so a bad one leaves the
+        game untouched.
+        """
+        if not self.current_user:
+            return []
+        player_codes = []
+        for choice in choices:
+            if not isinstance(choice, str) or choice.lower() not in MOVE_CODES:
+                raise ValueError(f"Invalid choice: {choice!r}")
+            player_codes.append(MOVE_CODES[choice.lower()])
+        if not player_codes:
+            return []
+
+        outcomes = []
+        rounds = []
+        win_rates = []
+        # Rounds in one batch share a timestamp, as the history only keeps seconds
+        timestamp = datetime.now().strftime(TIME_FORMAT)
+        with timer("game.resolve"):
+            for player_code in player_codes:
+                if self.opponent is not None:
+                    computer_code = self.opponent.next_move()
+                    self.opponent.observe(computer_code, player_code)
+                else:
+                    computer_code = random.randrange(3)
+                player_choice = MOVES[player_code]
+                computer_choice = MOVES[computer_code]
+
+                # Determine winner and update counts
+                result = RESULTS[OUTCOMES[player_code][computer_code]]
+                self.move_counts[player_choice] += 1
+                if result == 'wins':
+                    self.wins += 1
+                self.total_games += 1
+                win_rates.append(self.wins / self.total_games * 100)
+
+                record = {
+                    "username": self.current_user,
+                    "datetime": timestamp,
+                    "player": player_choice,
+                    "computer": computer_choice,
+                    "result": result
+                }
+                rounds.append((self._stats_row(), record))
+                outcomes.append((computer_choice, result))
+        count("game.rounds", len(rounds))
+
+        # Win rate after each round
+        self.win_rates.extend(win_rates)
+
+        # Persist the stats and every round in one commit
+        self.storage.save_rounds(rounds)
+
+        # Add to in-memory history
+        self.game_history.extend(record for _, record in rounds)
+
+        if self.leaderboard is not None:
+            self.leaderboard.update(self._stats_row())
+
+        return outcomes
+
+    @staticmethod
+    def _winrate_trend(results):
+        """Win rate after each round from one result code per round, starting at 0"""
+        import numpy as np
+        trend = array('f', [0])
+        if results:
+            wins = np.cumsum(np.frombuffer(results, dtype=np.int8) == RESULT_CODES['wins'])
+            rates = wins / np.arange(1, len(wins) + 1) * 100
+            trend.frombytes(rates.astype(np.float32).tobytes())
+        return trend
+
+    def _stats_row(self):
+        return {
             "username": self.current_user,
-            "datetime": timestamp,
-            "player": player_choice,
-            "computer": computer_choice,
-            "result": result
+            "total_games": self.total_games,
+            "wins": self.wins,
+            "rock": self.move_counts["rock"],
+            "paper": self.move_counts["paper"],
+            "scissors": self.move_counts["scissors"]
         }
-        history_df = pd.concat([history_df, pd.DataFrame([new_record])], ignore_index=True)
-        history_df.to_excel("game_history.xlsx", index=False)
-        
-        # Add to in-memory history
-        self.game_history.append(new_record)
-        
-        return computer_choice, result
 
     def get_stats(self):
         win_rate = f"{(self.wins / self.total_games * 100):.1f}%" if self.total_games > 0 else "0.0%"
@@ -136,5 +405,16 @@ class RPSGame:
     def get_move_distribution(self):
         return {k.capitalize(): v for k, v in self.move_counts.items()}
 
-    def get_winrate_trend(self):
-        return self.win_rates
+    def get_winrate_trend(self, max_points=None, positions=False):
+        """Win rate after each round, min/max downsampled to at most max_points.
+        With positions, returns (round numbers, win rates) of the points kept"""
+        if max_points is None or len(self.win_rates) <= max_points:
+            trend = list(self.win_rates)
+            return (list(range(len(trend))), trend) if positions else trend
+        import numpy as np
+        rounds, trend = downsample_minmax(np.frombuffer(self.win_rates, dtype=np.float32), max_points)
+        return (rounds.tolist(), trend.tolist()) if positions else trend.tolist()
+
+    def export_history(self, path="game_history.xlsx"):
+        """Export the full game history to a spreadsheet"""
+        return self.storage.export_history(path)
@@ -0,0 +1,203 @@
+import json
+import os
+
+HISTORY_COLUMNS = ["username", "datetime", "player", "computer", "result"]
+
+
+class HistoryLog:
+    """Append-only, line-oriented store for game history.
+
+    Every round is one JSON line appended to the end of the log. The
+    spreadsheet is still available through export_xlsx.
+    """
+
+    FORMAT = "log"
+
+    def __init__(self, log_path="game_history.log", legacy_path="game_history.xlsx"):
+        self.log_path = log_path
+        self.legacy_path = legacy_path
+        self._file = None
+
+    @property
+    def path(self):
+        return self.log_path
+
+    def recover(self, size=None):
+        """Get the log ready for appending: create it if it is missing,
+        seeded from the old spreadsheet, then cut it back to size, or drop
+        a partial last line a crash mid-write left behind.
+
+        It may replace or shorten the file, so callers sharing the log hold
+        the storage lock (ExcelStorage does this when it is first used).
+        """
+        if not os.path.exists(self.log_path):
+            self._import_legacy()
+        if size is not None and self.end_offset() > size:
+            self.truncate(size)
+        elif self._has_torn_tail():
+            with open(self.log_path, "rb") as f:
+                self.truncate(f.read().rfind(b"\n") + 1)
+
+    def _import_legacy(self):
+        """Create the log, copying any rounds from the legacy spreadsheet"""
+        records = []
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            import pandas as pd
+            df = pd.read_excel(self.legacy_path)
+            records = df.astype(str).to_dict("records")
+
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+            for record in records:
+                f.write(self._encode(record))
+        os.replace(tmp_path, self.log_path)
+
+    def _has_torn_tail(self):
+        with open(self.log_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    @staticmethod
+    def _encode(record):
+        return json.dumps({c: record[c] for c in HISTORY_COLUMNS}, separators=(",", ":")) + "\n"
+
+    @classmethod
+    def record_size(cls, record):
+        """Bytes record takes in the log (the JSON is ASCII-only)"""
+        return len(cls._encode(record))
+
+    @staticmethod
+    def _decode(line):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(record, dict) or any(c not in record for c in HISTORY_COLUMNS):
+            return None
+        return record
+
+    def _open_append(self):
+        # No newline translation, so byte offsets match on every platform
+        return open(self.log_path, "a", encoding="utf-8", newline="\n")
+
+    def append(self, record):
+        """Append a single round to the end of the log"""
+        if self._file is None:
+            self._file = self._open_append()
+        self._file.write(self._encode(record))
+        self._file.flush()
+
+    def append_many(self, records):
+        """Append a batch of rounds with a single write"""
+        if not records:
+            return
+        if self._file is None:
+            self._file = self._open_append()
+        self._file.write("".join(self._encode(record) for record in records))
+        self._file.flush()
+
+    def __iter__(self):
+        """Iterate over every well-formed record in the log, oldest first"""
+        return self.records()
+
+    def records(self, end=None, start=0):
+        """Iterate over the well-formed records between byte offsets start and end"""
+        for _, record in self.scan(start, end):
+            yield record
+
+    def scan(self, start=0, end=None):
+        """Iterate over (offset, record) for records that start at or after
+        start and end by end. start must be the beginning of a line.
+        """
+        if self._file is not None:
+            self._file.flush()
+        with open(self.log_path, "rb") as f:
+            f.seek(start)
+            pos = start
+            for line in f:
+                offset = pos
+                pos += len(line)
+                if end is not None and pos > end:
+                    return
+                record = self._decode(line.decode("utf-8", errors="replace"))
+                if record is not None:
+                    yield offset, record
+
+    def read(self, username, end=None):
+        """Return all rounds played by username, oldest first"""
+        return [record for record in self.records(end) if record["username"] == username]
+
+    def end_offset(self):
+        """Byte offset just past the last record, usable as a page cursor"""
+        if self._file is not None:
+            self._file.flush()
+        return os.path.getsize(self.log_path)
+
+    def read_page(self, username, before=None, limit=50, block_size=65536):
+        """Return up to limit of username's rounds that start before byte offset before.
+
+        Records come back newest first, together with the offset to pass as
+        before for the next (older) page, or None once the start of the log
+        is reached. The log is read backwards in blocks, so the cost depends
+        on how far back the page is rather than on the size of the log.
+        """
+        if before is None:
+            before = self.end_offset()
+        records = []
+        cursor = None
+        # Every line was written by _encode, so the user's lines contain their
+        # name exactly as json.dumps writes it; only those are parsed
+        needle = json.dumps(username).encode("utf-8")
+        with open(self.log_path, "rb") as f:
+            pos = before
+            partial = b""
+            while pos > 0 and len(records) < limit:
+                read_size = min(block_size, pos)
+                pos -= read_size
+                f.seek(pos)
+                chunk = f.read(read_size) + partial
+                lines = chunk.split(b"\n")
+                # The first piece may be the tail of a line in an earlier block
+                partial = lines.pop(0) if pos > 0 else b""
+                end = pos + len(chunk)
+                for line in reversed(lines):
+                    start = end - len(line)
+                    end = start - 1
+                    if not line or needle not in line:
+                        continue
+                    record = self._decode(line.decode("utf-8", errors="replace"))
+                    if record is not None and record["username"] == username:
+                        records.append(record)
+                        cursor = start
+                        if len(records) == limit:
+                            break
+        if len(records) < limit or cursor == 0:
+            cursor = None
+        return records, cursor
+
+    def sync(self):
+        """Force appended rounds onto the disk"""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def truncate(self, size):
+        """Cut the log back to size bytes, dropping everything after it"""
+        self.close()
+        os.truncate(self.log_path, size)
+
+    def export_xlsx(self, path="game_history.xlsx"):
+        """Write the whole log out as a spreadsheet"""
+        import pandas as pd
+        df = pd.DataFrame(list(self), columns=HISTORY_COLUMNS)
+        df.to_excel(path, index=False)
+        return len(df)
+
+    def close(self):
+        """Close the append handle"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,150 @@
+import customtkinter as ctk
+from metrics import timed
+
+ROW_HEIGHT = 30
+
+
+def format_record(record):
+    """One line of the history list for a single round"""
+    entry = f"{record['datetime']} - Player: {record['player'].title()} vs Computer: {record['computer'].title()} - "
+    entry += "Win 🎉" if record['result'] == 'wins' else "Loss 😢" if record['result'] == 'losses' else "Tie 🤝"
+    return entry
+
+
+class VirtualHistoryList(ctk.CTkFrame):
+    """Scrollable history list that only creates one viewport of row widgets.
+
+    Scrolling re-labels the existing rows instead of creating widgets.
+    Records come from a PagedHistory, loaded on the TaskRunner's worker
+    when one is given.
+    """
+
+    def __init__(self, master, height=400, tasks=None, **kwargs):
+        super().__init__(master, height=height, **kwargs)
+        self.tasks = tasks
+        self.grid_propagate(False)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.history = None
+        self.total = None
+        self.top = 0
+        self.rows = []
+
+        self.rows_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.rows_frame.grid(row=0, column=0, sticky="nsew")
+        self.rows_frame.grid_propagate(False)
+        self.rows_frame.grid_columnconfigure(0, weight=1)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self._set_row_count(max(height // ROW_HEIGHT, 1))
+        self.rows_frame.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.rows_frame)
+
+    def show(self, history, total=None):
+        """Display a PagedHistory from its newest record.
+
+        total is how many rounds it holds (e.g. the player's total_games),
+        so the scrollbar can be dragged to rounds not loaded yet.
+        """
+        self.history = history
+        self.total = total
+        self.top = 0
+        self._wanted_top = 0
+        self._render()
+        self._scroll_to(0)
+
+    def refresh(self):
+        """Redraw the current position, e.g. after new rounds were played"""
+        self._render()
+        self._scroll_to(self.top)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", lambda e: self._scroll_to(self.top - 3))
+        widget.bind("<Button-5>", lambda e: self._scroll_to(self.top + 3))
+
+    def _set_row_count(self, count):
+        while len(self.rows) < count:
+            label = ctk.CTkLabel(self.rows_frame, text="", anchor="w", height=ROW_HEIGHT)
+            label.grid(row=len(self.rows), column=0, padx=10, sticky="ew")
+            self._bind_wheel(label)
+            self.rows.append(label)
+        while len(self.rows) > count:
+            self.rows.pop().destroy()
+
+    def _on_resize(self, event):
+        count = max(event.height // ROW_HEIGHT, 1)
+        if count != len(self.rows):
+            self._set_row_count(count)
+            self._render()
+            self._scroll_to(self.top)
+
+    def _on_wheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        step = -int(event.delta / 120) if abs(event.delta) >= 120 else -event.delta
+        self._scroll_to(self.top + 3 * step)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(value) * self._known_total()))
+        elif action == "scroll":
+            step = int(value) * (len(self.rows) if unit == "pages" else 1)
+            self._scroll_to(self.top + step)
+
+    def _known_total(self):
+        """The total given to show(), else records loaded so far plus one
+        page if storage has more"""
+        if self.history is None:
+            return 0
+        if self.total is not None:
+            return max(self.total, self.history.loaded_count())
+        extra = self.history.page_size if self.history.has_more() else 0
+        return self.history.loaded_count() + extra
+
+    def _scroll_to(self, top):
+        if self.history is None:
+            return
+        top = max(top, 0)
+        # Make sure the rows just past the viewport are loaded before clamping
+        wanted = top + len(self.rows) + 1
+        loaded = False
+        if self.history.loaded_count() < wanted and self.history.has_more():
+            if self.tasks is not None:
+                self._fetch(top, wanted)
+                return
+            loaded = self.history.load_to(wanted) > 0
+        last_top = max(self.history.loaded_count() - len(self.rows), 0)
+        top = min(top, last_top)
+        if top != self.top or loaded:
+            self.top = top
+            self._render()
+
+    def _fetch(self, top, wanted):
+        # Drags keep asking while a load runs; the latest position is used
+        # once it is back, and it loads again if that is still short
+        self._wanted_top = top
+        history = self.history
+        self.tasks.submit('history_page', history.fetch, wanted - history.loaded_count(),
+                          on_done=lambda fetched: self._fetched(history, fetched))
+
+    def _fetched(self, history, fetched):
+        if history is not self.history:
+            return
+        history.add(fetched)
+        self._render()
+        self._scroll_to(self._wanted_top)
+
+    @timed("ui.history_render")
+    def _render(self):
+        records = self.history.peek(self.top, self.top + len(self.rows)) if self.history is not None else []
+        for i, label in enumerate(self.rows):
+            label.configure(text=format_record(records[i]) if i < len(records) else "")
+
+        total = self._known_total()
+        if total:
+            self.scrollbar.set(self.top / total, min((self.top + len(self.rows)) / total, 1.0))
+        else:
+            self.scrollbar.set(0, 1)
@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import uuid
+
+try:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+except ImportError:
+    # Windows: lock the first byte of the lock file instead
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after about 10 seconds; keep waiting
+                continue
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """Exclusive lock shared between processes through a lock file.
+
+    Re-entrant within a process: nested acquires from the thread that holds
+    it just count up, and other threads wait on an in-process lock first.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, "a+b")
+                _lock_file(self._file)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock_file(self._file)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def close(self):
+        with self._thread_lock:
+            if self._file is not None and self._depth == 0:
+                self._file.close()
+                self._file = None
+
+
+class Journal:
+    """Write-ahead journal: one JSON entry per line after a header line.
+
+    append() makes a batch of entries durable with a single write and fsync,
+    which is the commit point for everything in the batch. The header holds
+    a generation id that changes every time reset() or rotate() swaps in a
+    new journal, so readers can tell their offsets belong to an old one,
+    plus whatever the owner wants to record alongside it.
+
+    The caller is expected to hold the FileLock around every call.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    @staticmethod
+    def _encode(entry):
+        return json.dumps(entry, separators=(",", ":")) + "\n"
+
+    def _write(self, header, data=b""):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._encode(header).encode("utf-8"))
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return header
+
+    def reset(self, entries=(), **header):
+        """Atomically replace the journal with one holding entries. Returns its header"""
+        data = "".join(self._encode(entry) for entry in entries).encode("utf-8")
+        return self._write(dict(header, generation=uuid.uuid4().hex), data)
+
+    def rotate(self, offset=None, **header):
+        """Atomically start a new generation keeping the entries after offset.
+
+        The kept entries are copied byte for byte and the header records the
+        old generation and offset, so a reader that had already read up to
+        offset or further carries on in the new journal without rereading
+        anything (see read). offset None keeps every entry. Returns the header.
+        """
+        with open(self.path, "rb") as f:
+            old_line = f.readline()
+            old = json.loads(old_line)
+            if offset is None:
+                offset = len(old_line)
+            f.seek(offset)
+            data = f.read()
+        data = data[:data.rfind(b"\n") + 1]
+        header = dict(header, generation=uuid.uuid4().hex,
+                      previous=old["generation"], previous_offset=offset)
+        return self._write(header, data)
+
+    def read_header(self):
+        with open(self.path, "rb") as f:
+            return json.loads(f.readline())
+
+    def read(self, generation=None, offset=None):
+        """Read the entries after offset.
+
+        Returns (header, entries, offset, continued). continued is True when
+        the entries follow on from generation and offset, which may also be
+        in a newer generation rotated from it. Otherwise the offset is
+        ignored, every entry is returned and the reader must start over. A
+        torn last line from an interrupted append is left unread.
+        """
+        with open(self.path, "rb") as f:
+            header_line = f.readline()
+            header = json.loads(header_line)
+            continued = offset is not None
+            if header["generation"] == generation and continued:
+                pass
+            elif (continued and header.get("previous") == generation
+                    and offset >= header["previous_offset"]):
+                offset = len(header_line) + offset - header["previous_offset"]
+            else:
+                offset = len(header_line)
+                continued = False
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        entries = [json.loads(line) for line in data[:end].splitlines() if line]
+        return header, entries, offset + end, continued
+
+    def append(self, entries):
+        """Durably append a batch of entries"""
+        data = "".join(self._encode(entry) for entry in entries).encode("utf-8")
+        with open(self.path, "r+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                # A writer died mid-append: drop its partial line first
+                f.seek(0)
+                f.truncate(f.read().rfind(b"\n") + 1)
+            f.seek(0, os.SEEK_END)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
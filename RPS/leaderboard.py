@@ -0,0 +1,126 @@
+import heapq
+import threading
+
+# Board name -> heading shown for it
+BOARDS = {
+    'wins': "Most Wins",
+    'win_rate': "Best Win Rate",
+    'games': "Most Games",
+}
+MOVE_COLUMNS = ['rock', 'paper', 'scissors']
+
+
+class Leaderboard:
+    """Global rankings and totals, kept up to date one stats row at a time.
+
+    Each board is a heap of (-score, username) keys with lazy deletion: an
+    update pushes the user's new key, O(log n), and leaves the old one in
+    place. The current key of every user is kept alongside, and top(n) pops
+    entries until it has n current ones, dropping stale ones for good and
+    pushing the current ones back, O(n log n) plus the stale entries it
+    clears. Once stale entries outnumber current ones the heap is rebuilt
+    from the current keys, so it stays within twice the number of players.
+    Totals across all players are adjusted by the difference between the
+    old and new row. Only players with at least min_games games are ranked
+    by win rate.
+    """
+
+    def __init__(self, min_games=10):
+        self.min_games = min_games
+        self._rows = {}  # username -> (total_games, wins, rock, paper, scissors)
+        self._boards = {board: [] for board in BOARDS}
+        self._current = {board: {} for board in BOARDS}  # board -> username -> key
+        self._totals = {'total_games': 0, 'wins': 0, 'rock': 0, 'paper': 0, 'scissors': 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_storage(cls, storage, min_games=10):
+        """Build from every stats row in storage with one heapify per board"""
+        leaderboard = cls(min_games)
+        for stats in storage.iter_stats():
+            row = leaderboard._row(stats)
+            leaderboard._rows[stats["username"]] = row
+            for name, value in zip(leaderboard._totals, row):
+                leaderboard._totals[name] += value
+        for username, row in leaderboard._rows.items():
+            for board, key in leaderboard._keys(username, row).items():
+                leaderboard._current[board][username] = key
+        for board in BOARDS:
+            leaderboard._rebuild(board)
+        return leaderboard
+
+    def _rebuild(self, board):
+        self._boards[board] = list(self._current[board].values())
+        heapq.heapify(self._boards[board])
+
+    @staticmethod
+    def _row(stats):
+        return (int(stats["total_games"]), int(stats["wins"])) + tuple(int(stats[m]) for m in MOVE_COLUMNS)
+
+    def _keys(self, username, row):
+        total, wins = row[0], row[1]
+        keys = {'wins': (-wins, username), 'games': (-total, username)}
+        if total >= self.min_games:
+            keys['win_rate'] = (-(wins / total), username)
+        return keys
+
+    def update(self, stats):
+        """Replace one player's stats row"""
+        username = stats["username"]
+        row = self._row(stats)
+        with self._lock:
+            old = self._rows.get(username)
+            if old == row:
+                return
+            keys = self._keys(username, row)
+            for board in BOARDS:
+                current = self._current[board]
+                key = keys.get(board)
+                if key is None:
+                    current.pop(username, None)
+                elif current.get(username) != key:
+                    current[username] = key
+                    heapq.heappush(self._boards[board], key)
+                if len(self._boards[board]) > 2 * len(current) + 16:
+                    self._rebuild(board)
+            for name, new, before in zip(self._totals, row, old or (0,) * len(row)):
+                self._totals[name] += new - before
+            self._rows[username] = row
+
+    def top(self, board="wins", n=10):
+        """The n best players on board, best first"""
+        with self._lock:
+            heap = self._boards[board]
+            current = self._current[board]
+            best = []
+            while heap and len(best) < n:
+                key = heapq.heappop(heap)
+                # A user can have an equal stale key too, so take them once
+                if current.get(key[1]) == key and (not best or best[-1] != key):
+                    best.append(key)
+            for key in best:
+                heapq.heappush(heap, key)
+
+            entries = []
+            for rank, (_, username) in enumerate(best, 1):
+                total, wins = self._rows[username][:2]
+                entries.append({
+                    'rank': rank,
+                    'username': username,
+                    'total_games': total,
+                    'wins': wins,
+                    'win_rate': wins / total * 100 if total else 0.0
+                })
+            return entries
+
+    def totals(self):
+        """Aggregates over every player"""
+        with self._lock:
+            totals = dict(self._totals)
+            totals['players'] = len(self._rows)
+        totals['win_rate'] = totals['wins'] / totals['total_games'] * 100 if totals['total_games'] else 0.0
+        return totals
+
+    def snapshot(self, n=10):
+        """Every board's top n plus the totals"""
+        return {'boards': {board: self.top(board, n) for board in BOARDS}, 'totals': self.totals()}
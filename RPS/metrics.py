@@ -0,0 +1,234 @@
+"""Timers and counters for the hot paths, dumped to a file periodically.
+
+Instrumentation is off unless RPS_METRICS names an output file:
+
+    RPS_METRICS=metrics.jsonl python app.py   # one JSON snapshot per line
+    RPS_METRICS=rps.prom python server.py     # Prometheus textfile, rewritten
+
+RPS_METRICS_INTERVAL sets the seconds between dumps (default 10) and
+RPS_METRICS_SLOW_MS the duration above which a single call is also listed
+individually in the JSON snapshot (default 100).
+
+While disabled, timed() and timer() only check one module flag, so the
+hooks can stay in the code permanently.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Slow calls kept between two dumps
+MAX_SLOW = 100
+
+enabled = False
+slow_threshold = 0.1
+
+_lock = threading.Lock()
+_counters = {}
+_timers = {}
+_slow = deque(maxlen=MAX_SLOW)
+_dumper = None
+
+
+class _Timer:
+    """Running totals for one timed operation"""
+
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+
+def record(name, seconds):
+    """Add one duration to the timer called name"""
+    with _lock:
+        timer_stats = _timers.get(name)
+        if timer_stats is None:
+            timer_stats = _timers[name] = _Timer()
+        timer_stats.add(seconds)
+        if seconds >= slow_threshold:
+            _slow.append({'name': name, 'ms': round(seconds * 1000, 3), 'at': time.time()})
+
+
+def count(name, amount=1):
+    """Increment the counter called name"""
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+class _Timing:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+
+
+class _NoTiming:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NO_TIMING = _NoTiming()
+
+
+def timer(name):
+    """Context manager timing its block as name"""
+    return _Timing(name) if enabled else _NO_TIMING
+
+
+def timed(name):
+    """Decorator timing every call of the function as name"""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def snapshot(reset_slow=True):
+    """Current counters and timers as plain data"""
+    with _lock:
+        timers = {
+            name: {
+                'count': t.count,
+                'total_ms': round(t.total * 1000, 3),
+                'mean_ms': round(t.total / t.count * 1000, 3) if t.count else 0.0,
+                'max_ms': round(t.max * 1000, 3),
+                'buckets': list(t.buckets),
+            }
+            for name, t in _timers.items()
+        }
+        slow = list(_slow)
+        if reset_slow:
+            _slow.clear()
+        return {'at': time.time(), 'counters': dict(_counters), 'timers': timers, 'slow': slow}
+
+
+def _metric_name(name):
+    return "rps_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text(data):
+    """Render a snapshot in the Prometheus text exposition format"""
+    lines = []
+    for name, value in sorted(data['counters'].items()):
+        metric = _metric_name(name) + "_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    for name, t in sorted(data['timers'].items()):
+        metric = _metric_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, n in zip(BUCKETS, t['buckets']):
+            cumulative += n
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{le="+Inf"}} {t["count"]}')
+        lines.append(f"{metric}_sum {t['total_ms'] / 1000}")
+        lines.append(f"{metric}_count {t['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path):
+    """Write one snapshot: appended as JSON, or replacing a .prom file"""
+    data = snapshot()
+    if path.endswith(".prom"):
+        # The textfile collector may read at any time, so swap in a whole file
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(prometheus_text(data))
+        os.replace(tmp_path, path)
+    else:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(data) + "\n")
+
+
+class _Dumper(threading.Thread):
+    def __init__(self, path, interval):
+        super().__init__(name="metrics", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                dump(self.path)
+            except OSError:
+                # A missing directory or full disk must not take the game down
+                pass
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        try:
+            dump(self.path)
+        except OSError:
+            pass
+
+
+def enable(path=None, interval=10.0, slow_ms=100.0):
+    """Turn instrumentation on, dumping to path every interval seconds"""
+    global enabled, slow_threshold, _dumper
+    slow_threshold = slow_ms / 1000
+    enabled = True
+    if path and _dumper is None:
+        _dumper = _Dumper(path, interval)
+        _dumper.start()
+        atexit.register(disable)
+
+
+def disable():
+    """Turn instrumentation off, writing a last dump if one was configured"""
+    global enabled, _dumper
+    enabled = False
+    if _dumper is not None:
+        _dumper.stop()
+        _dumper = None
+
+
+def enable_from_env():
+    """enable() as configured by RPS_METRICS and friends, if set"""
+    path = os.environ.get("RPS_METRICS")
+    if path:
+        enable(path,
+               interval=float(os.environ.get("RPS_METRICS_INTERVAL", 10)),
+               slow_ms=float(os.environ.get("RPS_METRICS_SLOW_MS", 100)))
@@ -0,0 +1,334 @@
+"""Copy users, stats and game history from the spreadsheets into SQLite.
+
+The workbooks are streamed a row at a time with openpyxl's read-only mode,
+and the history log a record at a time, into batched transactions. Each
+batch also records how far the migration has got, so an interrupted run
+picks up where it stopped:
+
+    python migrate.py --target rps.db
+    python migrate.py --history game_history.xlsx   # this history instead
+
+Nothing is written next to the source files. When the game has a journal
+(rps.journal), its locks are held for the whole copy, the history is read
+from the file the journal names, and the entries not yet checkpointed are
+applied last, in one transaction. Without one, the history comes from
+game_history.log if there is one, otherwise game_history.xlsx.
+
+--restart throws away the recorded progress, and the history rows the
+earlier run inserted, and copies everything again.
+"""
+import argparse
+import json
+import os
+import time
+from contextlib import ExitStack
+from datetime import datetime
+from history_log import HISTORY_COLUMNS
+from journal import FileLock, Journal
+from storage import SQLiteStorage, STATS_COLUMNS, USER_COLUMNS, open_history
+
+PROGRESS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS migration_progress (
+        source TEXT PRIMARY KEY,
+        signature TEXT NOT NULL,
+        rows_done INTEGER NOT NULL,
+        finished INTEGER NOT NULL DEFAULT 0,
+        first_id INTEGER,
+        last_id INTEGER
+    );
+"""
+
+# Target table, its columns and how to insert each kind of source
+TABLES = {
+    'users': ("users", USER_COLUMNS, "INSERT OR IGNORE"),
+    'stats': ("stats", STATS_COLUMNS, "INSERT OR REPLACE"),
+    'history': ("history", HISTORY_COLUMNS, "INSERT"),
+}
+INTEGER_COLUMNS = set(STATS_COLUMNS[1:])
+
+
+def cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def xlsx_rows(path, columns, skip=0):
+    """Rows of the workbook's first sheet as lists in columns order.
+
+    Returns (row count or None, generator). Loading a large workbook is
+    slow even in read-only mode, so it is only opened once for both.
+    """
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    sheet = wb.worksheets[0]
+    total = sheet.max_row - 1 if sheet.max_row else None
+    return total, _sheet_rows(wb, sheet, path, columns, skip)
+
+
+def _sheet_rows(wb, sheet, path, columns, skip):
+    try:
+        rows = sheet.iter_rows(values_only=True)
+        header = [cell_text(value) for value in next(rows, ())]
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+        positions = [header.index(c) for c in columns]
+        for index, row in enumerate(rows):
+            if index < skip:
+                continue
+            if not any(value is not None for value in row):
+                # Still counted, so resuming skips the same rows
+                yield None
+                continue
+            yield [row[i] if i < len(row) else None for i in positions]
+    finally:
+        wb.close()
+
+
+def log_rows(path, columns, skip=0):
+    """Rows of a JSON-lines history log, as xlsx_rows (without a count)"""
+    return None, _log_rows(path, columns, skip)
+
+
+def _log_rows(path, columns, skip):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for index, line in enumerate(f):
+            if index < skip:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict) or any(c not in record for c in columns):
+                # Still counted, so resuming skips the same lines
+                yield None
+                continue
+            yield [record[c] for c in columns]
+
+
+def history_rows(history, columns, end=None, skip=0):
+    """Rows of a HistoryLog or BinaryHistoryLog up to byte offset end, as
+    xlsx_rows (without a count)"""
+    return None, _history_rows(history, columns, end, skip)
+
+
+def _history_rows(history, columns, end, skip):
+    for index, record in enumerate(history.records(end)):
+        if index >= skip:
+            yield [record[c] for c in columns]
+
+
+def signature(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def history_signature(history):
+    # The history is only ever appended to, so resuming just skips the
+    # rounds already copied; it only has to be the same history
+    return f"{history.FORMAT}:{os.path.abspath(history.path)}"
+
+
+class Migration:
+    def __init__(self, target="rps.db", batch_size=5000, log=print):
+        self.storage = SQLiteStorage(target)
+        self.conn = self.storage.conn
+        self.batch_size = batch_size
+        self.log = log
+        with self.conn:
+            self.conn.executescript(PROGRESS_SCHEMA)
+
+    def progress(self, kind):
+        return self.conn.execute(
+            "SELECT signature, rows_done, finished, first_id, last_id FROM migration_progress "
+            "WHERE source = ?", (kind,)
+        ).fetchone()
+
+    def reset(self):
+        """Forget earlier progress, removing the history it copied"""
+        with self.conn:
+            for done in self.conn.execute("SELECT first_id, last_id FROM migration_progress "
+                                          "WHERE first_id IS NOT NULL").fetchall():
+                # History has no natural key, so a second copy would duplicate it
+                self.conn.execute("DELETE FROM history WHERE id BETWEEN ? AND ?",
+                                  (done["first_id"], done["last_id"]))
+            self.conn.execute("DELETE FROM migration_progress")
+
+    def copy(self, kind, path=None, history=None, end=None):
+        """Copy one source file, or a history log up to byte offset end,
+        resuming from any recorded progress"""
+        table, columns, verb = TABLES[kind]
+        if history is not None:
+            path = history.path
+            sig = history_signature(history)
+        else:
+            sig = signature(path)
+        done = self.progress(kind)
+        if done is not None and done["signature"] != sig:
+            raise RuntimeError(f"{path} changed since the last run; use --restart to copy it again")
+        if done is not None and done["finished"]:
+            self.log(f"{kind}: already migrated ({done['rows_done']} rows)")
+            return done["rows_done"]
+        skip = done["rows_done"] if done is not None else 0
+
+        if history is not None:
+            total, rows = history_rows(history, columns, end, skip)
+        else:
+            reader = log_rows if path.endswith(".log") else xlsx_rows
+            total, rows = reader(path, columns, skip)
+        sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        started = time.perf_counter()
+        rows_done = skip
+        batch = []
+        consumed = 0
+        for row in rows:
+            consumed += 1
+            if row is not None:
+                batch.append([int(float(v or 0)) if c in INTEGER_COLUMNS else cell_text(v)
+                              for c, v in zip(columns, row)])
+            if consumed == self.batch_size:
+                rows_done = self._commit(kind, sig, sql, batch, rows_done + consumed)
+                batch, consumed = [], 0
+                self._report(kind, rows_done, skip, total, started)
+        rows_done = self._commit(kind, sig, sql, batch, rows_done + consumed, finished=True)
+        self._report(kind, rows_done, skip, total, started)
+        return rows_done
+
+    def _commit(self, kind, sig, sql, batch, rows_done, finished=False):
+        # The rows and the progress marker land together or not at all
+        with self.conn:
+            done = self.progress(kind)
+            first_id = done["first_id"] if done is not None else None
+            last_id = done["last_id"] if done is not None else None
+            if batch:
+                if kind == 'history' and first_id is None:
+                    first_id = self._max_history_id() + 1
+                self.conn.executemany(sql, batch)
+                if kind == 'history':
+                    last_id = self._max_history_id()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO migration_progress "
+                "(source, signature, rows_done, finished, first_id, last_id) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, sig, rows_done, int(finished), first_id, last_id))
+        return rows_done
+
+    def replay(self, entries, sig):
+        """Apply journal entries not yet checkpointed, in one transaction"""
+        done = self.progress('journal')
+        if done is not None and done["signature"] != sig:
+            raise RuntimeError("the journal changed since the last run; use --restart to copy it again")
+        if done is not None and done["finished"]:
+            self.log(f"journal: already applied ({done['rows_done']} entries)")
+            return done["rows_done"]
+        stats_sql = f"INSERT OR REPLACE INTO stats ({', '.join(STATS_COLUMNS)}) " \
+                    f"VALUES ({', '.join('?' * len(STATS_COLUMNS))})"
+        with self.conn:
+            first_id = self._max_history_id() + 1
+            for entry in entries:
+                kind = entry["type"]
+                if kind == "user":
+                    self.conn.execute(
+                        f"INSERT OR IGNORE INTO users ({', '.join(USER_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(USER_COLUMNS))})",
+                        [cell_text(entry["user"][c]) for c in USER_COLUMNS])
+                elif kind == "login":
+                    self.conn.execute("UPDATE users SET last_login = ? WHERE username = ?",
+                                      (entry["timestamp"], entry["username"]))
+                elif kind in ("stats", "round"):
+                    self.conn.execute(stats_sql, [entry["stats"][c] for c in STATS_COLUMNS])
+                if kind == "round":
+                    self.conn.execute(
+                        f"INSERT INTO history ({', '.join(HISTORY_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(HISTORY_COLUMNS))})",
+                        [cell_text(entry["record"][c]) for c in HISTORY_COLUMNS])
+            last_id = self._max_history_id()
+            if last_id < first_id:
+                first_id = last_id = None
+            self.conn.execute(
+                "INSERT OR REPLACE INTO migration_progress "
+                "(source, signature, rows_done, finished, first_id, last_id) VALUES (?, ?, ?, 1, ?, ?)",
+                ('journal', sig, len(entries), first_id, last_id))
+        self.log(f"journal: {len(entries)} entries applied")
+        return len(entries)
+
+    def _max_history_id(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM history").fetchone()[0]
+
+    def _report(self, kind, rows_done, skip, total, started):
+        elapsed = time.perf_counter() - started
+        rate = (rows_done - skip) / elapsed if elapsed > 0 else 0.0
+        of_total = f"/{total} ({rows_done / total * 100:.0f}%)" if total else ""
+        self.log(f"{kind}: {rows_done}{of_total} rows, {rate:,.0f} rows/s")
+
+    def close(self):
+        self.storage.close()
+
+
+def migrate(target="rps.db", users="users.xlsx", stats="game_data.xlsx", history=None,
+            journal="rps.journal", batch_size=5000, restart=False, log=print):
+    """Copy everything into target; history None picks the game's own"""
+    migration = Migration(target, batch_size=batch_size, log=log)
+    # The same locks, in the same order, as ExcelStorage, so no game
+    # commits or checkpoints while the files are read
+    locks = [FileLock(journal + ".checkpoint.lock"), FileLock(journal + ".lock")] \
+        if os.path.exists(journal) else []
+    try:
+        if restart:
+            migration.reset()
+        with ExitStack() as stack:
+            for lock in locks:
+                stack.enter_context(lock)
+            header, entries = None, []
+            if locks:
+                header, entries, offset, _ = Journal(journal).read()
+
+            sources = [('users', users), ('stats', stats)]
+            if history is not None:
+                sources.append(('history', history))
+            elif header is None:
+                log_path = "game_history.log"
+                sources.append(('history', log_path if os.path.exists(log_path) else "game_history.xlsx"))
+            for kind, path in sources:
+                if not os.path.exists(path):
+                    log(f"{kind}: {path} not found, skipping")
+                    continue
+                migration.copy(kind, path)
+
+            if header is not None:
+                if history is None:
+                    # The log up to the recorded size; anything past it is
+                    # from an unfinished checkpoint and still in the journal
+                    source = open_history(header.get("history_format", "log"), header.get("history_path"))
+                    if os.path.exists(source.path):
+                        migration.copy('history', history=source, end=header["history_size"])
+                migration.replay(entries, f"{header['generation']}:{offset}")
+    finally:
+        migration.close()
+        for lock in locks:
+            lock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the RPS spreadsheets into a SQLite database")
+    parser.add_argument("--target", default="rps.db", help="SQLite database to fill")
+    parser.add_argument("--users", default="users.xlsx")
+    parser.add_argument("--stats", default="game_data.xlsx")
+    parser.add_argument("--journal", default="rps.journal",
+                        help="The game's journal, applied last if it exists")
+    parser.add_argument("--history",
+                        help="Copy history from this workbook or .log file instead of the game's")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per transaction")
+    parser.add_argument("--restart", action="store_true", help="Ignore progress from an earlier run")
+    args = parser.parse_args()
+
+    migrate(args.target, args.users, args.stats, args.history, args.journal,
+            batch_size=args.batch_size, restart=args.restart)
+
+
+if __name__ == "__main__":
+    main()
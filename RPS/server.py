@@ -0,0 +1,240 @@
+"""Multi-session game server speaking newline-delimited JSON.
+
+Every connection gets its own GameSession. A request is one JSON object per
+line, for example:
+
+    {"id": 1, "op": "login", "username": "sonali", "password": "..."}
+    {"id": 2, "op": "play", "choice": "rock"}
+
+and each gets one JSON line back with the same id and either
+"ok": true plus a "result", or "ok": false plus an "error".
+
+Ops: register, login, logout, play, play_many, stats, history, leaderboard,
+ping. play_many takes a "choices" list and saves the whole batch at once.
+
+Storage calls block, so they run on a thread pool and never stall the
+event loop; rounds go through write-behind storage, so plays do not wait on
+disk either.
+
+    python server.py --port 8765
+    python server.py --unix /tmp/rps.sock --storage sqlite
+"""
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import metrics
+from concurrent.futures import ThreadPoolExecutor
+from game_utils import MOVES
+from leaderboard import Leaderboard
+from session import GameSession
+from storage import open_storage
+from strategies import make_opponent
+from write_behind import WriteBehindStorage
+
+logger = logging.getLogger(__name__)
+
+# Longest request line accepted from a client
+MAX_LINE = 64 * 1024
+# Most rounds one play_many request may play
+MAX_BATCH = 5000
+
+
+class RequestError(Exception):
+    """A bad request, reported back to the client instead of raised"""
+
+
+class GameServer:
+    def __init__(self, storage, workers=8, trend_points=500, opponent=None, leaderboard=None):
+        self.storage = storage
+        self.opponent = opponent
+        # One leaderboard shared by every session
+        self.leaderboard = leaderboard
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage")
+        self.trend_points = trend_points
+        self.sessions = set()
+        # Handler task -> its writer, for every open connection
+        self.connections = {}
+
+    async def handle_connection(self, reader, writer):
+        # Each session gets its own opponent model
+        session = GameSession(self.storage, opponent=make_opponent(self.opponent), leaderboard=self.leaderboard)
+        self.sessions.add(session)
+        self.connections[asyncio.current_task()] = writer
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    await self._send(writer, {"ok": False, "error": "Request too long"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                # Requests on one connection are handled in order, one at a
+                # time, so a session's RPSGame is never used by two threads
+                response = await loop.run_in_executor(self.executor, self.handle_line, session, line)
+                await self._send(writer, response)
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions.discard(session)
+            if session.is_authenticated():
+                # Rounds are flushed by write-behind, no need to force it here
+                await loop.run_in_executor(self.executor, session.logout, False)
+            writer.close()
+            self.connections.pop(asyncio.current_task(), None)
+
+    async def close_connections(self):
+        """Close every client connection and wait for its handler to finish"""
+        handlers = list(self.connections)
+        for writer in self.connections.values():
+            writer.close()
+        if handlers:
+            await asyncio.gather(*handlers, return_exceptions=True)
+
+    async def _send(self, writer, response):
+        writer.write(json.dumps(response).encode("utf-8") + b"\n")
+        await writer.drain()
+
+    def handle_line(self, session, line):
+        """Decode one request line and run it against session (worker thread)"""
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise RequestError("Invalid JSON")
+            if not isinstance(request, dict):
+                raise RequestError("Request must be a JSON object")
+            request_id = request.get("id")
+            result = self.dispatch(session, request)
+            return {"id": request_id, "ok": True, "result": result}
+        except RequestError as e:
+            return {"id": request_id, "ok": False, "error": str(e)}
+        except Exception:
+            logger.exception("Request failed")
+            return {"id": request_id, "ok": False, "error": "Internal error"}
+
+    def dispatch(self, session, request):
+        op = request.get("op")
+        if op == "ping":
+            return "pong"
+        if op == "register":
+            success, message = session.register(
+                self._field(request, "username"), self._field(request, "password"),
+                request.get("email", ""))
+            return {"success": success, "message": message}
+        if op == "login":
+            success, message = session.login(self._field(request, "username"), self._field(request, "password"))
+            return {"success": success, "message": message}
+
+        if not session.is_authenticated():
+            raise RequestError("Not logged in")
+        if op == "logout":
+            session.logout(flush=False)
+            return {"success": True}
+        if op == "play":
+            choice = self._field(request, "choice").lower()
+            if choice not in MOVES:
+                raise RequestError("choice must be rock, paper or scissors")
+            computer_choice, result = session.play(choice)
+            return {"computer": computer_choice, "result": result, "stats": session.game.get_stats()}
+        if op == "play_many":
+            choices = request.get("choices")
+            if not isinstance(choices, list) or not 0 < len(choices) <= MAX_BATCH:
+                raise RequestError(f"choices must be a list of 1 to {MAX_BATCH} moves")
+            if any(not isinstance(c, str) or c.lower() not in MOVES for c in choices):
+                raise RequestError("choices must be rock, paper or scissors")
+            outcomes = session.play_many(choices)
+            return {"rounds": [{"computer": computer_choice, "result": result}
+                               for computer_choice, result in outcomes],
+                    "stats": session.game.get_stats()}
+        if op == "stats":
+            return session.analytics(min(self._int(request, "max_points", self.trend_points), self.trend_points))
+        if op == "history":
+            offset = max(self._int(request, "offset", 0), 0)
+            limit = min(max(self._int(request, "limit", 50), 0), 500)
+            return {"records": session.history(offset, limit)}
+        if op == "leaderboard":
+            board = session.leaderboard(min(max(self._int(request, "limit", 10), 0), 100))
+            if board is None:
+                raise RequestError("Leaderboard is not available")
+            return board
+        raise RequestError(f"Unknown op: {op}")
+
+    @staticmethod
+    def _field(request, name):
+        value = request.get(name)
+        if not isinstance(value, str) or not value:
+            raise RequestError(f"Missing field: {name}")
+        return value
+
+    @staticmethod
+    def _int(request, name, default):
+        value = request.get(name, default)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise RequestError(f"{name} must be an integer")
+        return value
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.storage.close()
+
+
+async def serve(args):
+    storage = WriteBehindStorage(open_storage(args.storage))
+    leaderboard = Leaderboard.from_storage(storage)
+    game_server = GameServer(storage, workers=args.workers, opponent=args.opponent, leaderboard=leaderboard)
+    if args.unix:
+        server = await asyncio.start_unix_server(game_server.handle_connection, path=args.unix, limit=MAX_LINE)
+    else:
+        server = await asyncio.start_server(game_server.handle_connection, args.host, args.port,
+                                            limit=MAX_LINE, backlog=args.backlog)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Not available on Windows; Ctrl+C still raises KeyboardInterrupt
+            pass
+
+    logger.info("Serving on %s", ", ".join(str(s.getsockname()) for s in server.sockets))
+    async with server:
+        await stop.wait()
+        # Stop accepting, then end every open session while the storage
+        # threads are still there to log it out
+        server.close()
+        await game_server.close_connections()
+    # Final flush of queued rounds once no more requests can arrive
+    game_server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rock Paper Scissors game server (newline-delimited JSON)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument("--storage", default="excel", help="Storage backend: excel, binary or sqlite")
+    parser.add_argument("--workers", type=int, default=8, help="Threads for blocking storage calls")
+    parser.add_argument("--backlog", type=int, default=1024)
+    parser.add_argument("--opponent", default="random", help="Computer player: random, markov, frequency or pattern")
+    args = parser.parse_args()
+    try:
+        # Fail now rather than on every connection
+        make_opponent(args.opponent)
+    except ValueError as e:
+        parser.error(str(e))
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    metrics.enable_from_env()
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from game_utils import RPSGame
+from user_utils import UserManager
+
+
+class GameSession:
+    """One player's session: who is logged in plus their game state.
+
+    This is the whole game without any GUI, so the Tk app and the network
+    server drive the same core. Sessions can share one storage backend.
+    """
+
+    def __init__(self, storage, opponent=None, leaderboard=None):
+        self.storage = storage
+        self.user_manager = UserManager(storage=storage)
+        self.game = RPSGame(storage, opponent=opponent, leaderboard=leaderboard)
+
+    def register(self, username, password, email):
+        """Create an account"""
+        return self.user_manager.register_user(username, password, email)
+
+    def login(self, username, password):
+        """Authenticate and load the user's stats"""
+        success, message = self.user_manager.authenticate(username, password)
+        if success:
+            # Set the current user in the game
+            self.game.set_user(username)
+        return success, message
+
+    def logout(self, flush=True):
+        """End the session, writing out queued rounds unless flush is False"""
+        if flush:
+            self.storage.flush()
+        self.user_manager.logout()
+        self.game.current_user = None
+
+    def is_authenticated(self):
+        return self.user_manager.is_authenticated()
+
+    def get_current_user(self):
+        return self.user_manager.get_current_user()
+
+    def play(self, choice):
+        """Play one round, returning (computer_choice, result)"""
+        return self.game.play(choice)
+
+    def play_many(self, choices):
+        """Play a sequence of rounds saved in one write, returning their outcomes"""
+        return self.game.play_many(choices)
+
+    def analytics(self, max_points=None):
+        """Stats, move distribution and win rate trend (with the round
+        number of each point) in one dict"""
+        trend_rounds, trend = self.game.get_winrate_trend(max_points, positions=True)
+        return {
+            'stats': self.game.get_stats(),
+            'moves': self.game.get_move_distribution(),
+            'trend': trend,
+            'trend_rounds': trend_rounds
+        }
+
+    def leaderboard(self, n=10):
+        """Top n players on every board plus global totals"""
+        if self.game.leaderboard is None:
+            return None
+        return self.game.leaderboard.snapshot(n)
+
+    def history(self, offset=0, limit=50):
+        """History records offset..offset+limit counting back from the newest"""
+        return self.game.game_history.get(offset, offset + limit)
@@ -0,0 +1,74 @@
+import numpy as np
+from game_utils import MOVES, RESULTS, OUTCOMES
+
+# OUTCOME_TABLE[player, computer] -> index into RESULTS
+OUTCOME_TABLE = np.array(OUTCOMES, dtype=np.int8)
+TIE, WIN, LOSS = (RESULTS.index(r) for r in ('ties', 'wins', 'losses'))
+
+
+def encode_moves(moves):
+    """Convert a sequence of move names or codes to an int8 array of codes"""
+    arr = np.asarray(moves)
+    if arr.dtype.kind in "iu":
+        codes = arr.astype(np.int8, copy=False)
+    else:
+        arr = np.char.lower(arr.astype(str))
+        codes = np.full(arr.shape, -1, dtype=np.int8)
+        for code, move in enumerate(MOVES):
+            codes[arr == move] = code
+    if codes.size and (codes.min() < 0 or codes.max() > 2):
+        raise ValueError("Moves must be rock, paper or scissors")
+    return codes
+
+
+def random_moves(n, seed=None):
+    """Draw n uniformly random move codes"""
+    return np.random.default_rng(seed).integers(0, 3, size=n, dtype=np.int8)
+
+
+def resolve(player_codes, opponent_codes):
+    """Return the result code of every round"""
+    if player_codes.shape != opponent_codes.shape:
+        raise ValueError("Player and opponent move sequences must be the same length")
+    return OUTCOME_TABLE[player_codes, opponent_codes]
+
+
+def simulate(player_moves, opponent_moves=None, seed=None):
+    """Resolve a whole sequence of rounds at once without touching storage.
+
+    Moves may be names ('rock', ...) or codes (0, 1, 2). When opponent_moves
+    is None the opponent plays uniformly at random, like RPSGame.play.
+    Returns a dict with 'stats', 'moves' and 'trend' shaped like
+    RPSGame.get_stats, get_move_distribution and get_winrate_trend, plus the
+    per-result counts and the raw result codes.
+    """
+    player_codes = encode_moves(player_moves)
+    if opponent_moves is None:
+        opponent_codes = random_moves(player_codes.size, seed)
+    else:
+        opponent_codes = encode_moves(opponent_moves)
+    results = resolve(player_codes, opponent_codes)
+
+    total_games = int(results.size)
+    result_counts = np.bincount(results, minlength=3)
+    move_counts = np.bincount(player_codes, minlength=3)
+    wins = int(result_counts[WIN])
+
+    # Cumulative win rate after every round, starting from 0 like RPSGame
+    trend = np.empty(total_games + 1, dtype=np.float32)
+    trend[0] = 0
+    if total_games:
+        trend[1:] = np.cumsum(results == WIN) * 100.0 / np.arange(1, total_games + 1)
+
+    win_rate = f"{(wins / total_games * 100):.1f}%" if total_games > 0 else "0.0%"
+    return {
+        'stats': {
+            'total_games': total_games,
+            'wins': wins,
+            'win_rate': win_rate
+        },
+        'moves': {move.capitalize(): int(move_counts[code]) for code, move in enumerate(MOVES)},
+        'trend': trend,
+        'results': {result: int(result_counts[code]) for code, result in enumerate(RESULTS)},
+        'result_codes': results
+    }
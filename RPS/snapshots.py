@@ -0,0 +1,96 @@
+import json
+import os
+
+RESULT_CODES = {'ties': 0, 'wins': 1, 'losses': 2}
+
+
+def result_codes(records):
+    """Results of records as one byte each, indexes into game_utils.RESULTS"""
+    return bytes(RESULT_CODES[record["result"]] for record in records)
+
+
+class SnapshotStore:
+    """Per-user snapshots of every round's result, folded from the history log.
+
+    A snapshot is a small JSON header line followed by one byte per round,
+    and records the log offset it covers, so loading a user's results is the
+    snapshot plus whatever the log holds after that offset. compact() folds
+    everything up to a given offset into the snapshots and remembers how far
+    it got; the header offsets make an interrupted compaction safe to rerun.
+
+    Callers hold the storage lock around every call.
+    """
+
+    def __init__(self, directory="stats_snapshots"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._offset_path = os.path.join(directory, "compacted")
+
+    def _path(self, username):
+        # Hex keeps any username a valid file name
+        return os.path.join(self.directory, username.encode("utf-8").hex() + ".snap")
+
+    def load(self, username):
+        """Return (offset covered, result codes) for username, or (None, b"")"""
+        try:
+            with open(self._path(username), "rb") as f:
+                header = json.loads(f.readline())
+                return header["offset"], f.read()
+        except FileNotFoundError:
+            return None, b""
+
+    def save(self, username, offset, codes):
+        path = self._path(username)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps({"username": username, "offset": offset, "rounds": len(codes)}).encode("utf-8"))
+            f.write(b"\n")
+            f.write(codes)
+        os.replace(tmp_path, path)
+
+    def compacted_offset(self):
+        """Log offset up to which every round is in a snapshot"""
+        try:
+            with open(self._offset_path, "r", encoding="utf-8") as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def results(self, username, history_log, end, pending=()):
+        """username's result codes for the log up to byte offset end, then
+        pending, the (offset, record) pairs of rounds not yet in the log"""
+        offset, codes = self.load(username)
+        # Every compaction touches each user with rounds in its range, so the
+        # user has none between their snapshot and the compacted offset
+        offset = max(offset or 0, self.compacted_offset())
+        tail = (record for record in history_log.records(end, start=offset)
+                if record["username"] == username)
+        # A compaction can get ahead of end when its checkpoint was cut
+        # short; pending rounds it already folded are skipped, not counted twice
+        pending = (record for record_offset, record in pending
+                   if record_offset >= offset and record["username"] == username)
+        return codes + result_codes(tail) + result_codes(pending)
+
+    def compact(self, history_log, end):
+        """Fold the log up to byte offset end into the snapshots"""
+        start = self.compacted_offset()
+        if start >= end:
+            return 0
+        folded = {}  # username -> (snapshot offset, codes)
+        for offset, record in history_log.scan(start, end):
+            username = record["username"]
+            entry = folded.get(username)
+            if entry is None:
+                entry = folded[username] = self.load(username)
+                entry = folded[username] = (entry[0] or 0, bytearray(entry[1]))
+            # Rounds before the snapshot's offset are already in it
+            if offset >= entry[0]:
+                entry[1].append(RESULT_CODES[record["result"]])
+        for username, (_, codes) in folded.items():
+            self.save(username, end, bytes(codes))
+
+        tmp_path = self._offset_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(end))
+        os.replace(tmp_path, self._offset_path)
+        return len(folded)
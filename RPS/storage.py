@@ -0,0 +1,728 @@
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from history_log import HistoryLog, HISTORY_COLUMNS
+from journal import FileLock, Journal
+from metrics import timed
+from snapshots import SnapshotStore, result_codes
+
+logger = logging.getLogger(__name__)
+
+USER_COLUMNS = ["username", "password", "email", "created_at", "last_login"]
+STATS_COLUMNS = ["username", "total_games", "wins", "rock", "paper", "scissors"]
+
+
+def empty_stats(username):
+    """Stats row for a user who has not played yet"""
+    return {"username": username, "total_games": 0, "wins": 0, "rock": 0, "paper": 0, "scissors": 0}
+
+
+class Storage:
+    """Interface shared by UserManager and RPSGame for all persistence.
+
+    Users, per-user stats and game history are kept behind this interface so
+    the game logic does not care whether they live in spreadsheets or a
+    database.
+    """
+
+    def get_user(self, username):
+        """Return the user's row as a dict, or None if there is no such user"""
+        raise NotImplementedError
+
+    def add_user(self, user):
+        """Insert a new user row. Returns False if the username is taken"""
+        raise NotImplementedError
+
+    def update_last_login(self, username, timestamp):
+        """Record a successful login"""
+        raise NotImplementedError
+
+    def get_stats(self, username):
+        """Return the user's stats row as a dict, or None if there is none"""
+        raise NotImplementedError
+
+    def create_stats(self, username):
+        """Insert an all-zero stats row for username"""
+        raise NotImplementedError
+
+    def iter_stats(self):
+        """Iterate over every user's stats row"""
+        raise NotImplementedError
+
+    def save_round(self, stats, record):
+        """Persist the updated stats row and the round's history record together"""
+        raise NotImplementedError
+
+    def save_rounds(self, rounds):
+        """Persist a batch of (stats, record) pairs, oldest first"""
+        for stats, record in rounds:
+            self.save_round(stats, record)
+
+    def flush(self):
+        """Make sure every accepted write has reached the backing store"""
+
+    def load_history(self, username):
+        """Return every history record for username, oldest first"""
+        raise NotImplementedError
+
+    def history_cursor(self):
+        """Cursor positioned after the newest round stored so far"""
+        raise NotImplementedError
+
+    def load_results(self, username):
+        """Every round's result for username as one byte each, oldest first"""
+        return result_codes(self.load_history(username))
+
+    def load_history_page(self, username, before=None, limit=50):
+        """Return up to limit of username's rounds older than cursor before.
+
+        Records come back newest first, along with the cursor for the next
+        (older) page, or None when there are no more.
+        """
+        raise NotImplementedError
+
+    def export_history(self, path="game_history.xlsx"):
+        """Write all history out to a spreadsheet, returning the row count"""
+        import pandas as pd
+        df = pd.DataFrame(list(self.iter_history()), columns=HISTORY_COLUMNS)
+        df.to_excel(path, index=False)
+        return len(df)
+
+    def iter_history(self):
+        """Iterate over every history record, oldest first"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any open files or connections"""
+
+
+class ExcelStorage(Storage):
+    """Spreadsheet backend: users.xlsx, game_data.xlsx and the history log.
+
+    Changes go to a write-ahead journal first and are folded into the files
+    by checkpoints, so several processes can share them.
+    """
+
+    # Journal entries after which the spreadsheets are brought up to date
+    CHECKPOINT_ENTRIES = 1000
+    # Uncompacted history log bytes that trigger compaction on load
+    COMPACT_BYTES = 1 << 20
+
+    def __init__(self, users_path="users.xlsx", data_path="game_data.xlsx", history_log=None,
+                 journal_path="rps.journal", snapshot_dir="stats_snapshots"):
+        # pandas is imported on first use so opening storage stays cheap
+        self.users_path = users_path
+        self.data_path = data_path
+        self.history_log = history_log if history_log is not None else HistoryLog()
+        self.journal = Journal(journal_path)
+        self.lock = FileLock(journal_path + ".lock")
+        # Held for a whole checkpoint, and taken before self.lock
+        self.checkpoint_lock = FileLock(journal_path + ".checkpoint.lock")
+        # Per-user result snapshots, so loading results only reads the log
+        # written since; the binary history has a result column instead
+        self.snapshots = SnapshotStore(snapshot_dir) if self.history_log.FORMAT == "log" else None
+
+        # Spreadsheet contents plus every journal entry read so far
+        self._opened = False
+        self._users = {}
+        self._stats = {}
+        self._generation = None
+        self._offset = None
+        self._entries = 0
+        # Rounds committed since the last checkpoint, as (log offset, record);
+        # the offset is where the checkpoint will write the record
+        self._rounds = []
+        self._history_size = 0
+        self._history_end = 0
+        self._history_format = None
+
+        self._checkpointer = None
+        self._checkpoint_wanted = threading.Event()
+        self._closing = False
+
+    def _open(self):
+        """Create missing files and repair the history on first use"""
+        if self._opened:
+            return
+        with self.checkpoint_lock, self.lock:
+            if self._opened:
+                return
+            # Create users file if it doesn't exist
+            if not os.path.exists(self.users_path):
+                import pandas as pd
+                df = pd.DataFrame(columns=USER_COLUMNS)
+                df.to_excel(self.users_path, index=False)
+
+            # Create data file if it doesn't exist
+            if not os.path.exists(self.data_path):
+                import pandas as pd
+                df = pd.DataFrame(columns=STATS_COLUMNS)
+                df.to_excel(self.data_path, index=False)
+
+            if not self.journal.exists():
+                self.history_log.recover()
+                self.journal.reset(history_size=self.history_log.end_offset(),
+                                   history_format=self.history_log.FORMAT,
+                                   history_path=self.history_log.path,
+                                   spreadsheets=self._spreadsheet_signature())
+            # The header names the history its offsets belong to, so a
+            # journal is never replayed against the other format's file
+            header = self.journal.read_header()
+            previous_format = header.get("history_format", "log")
+            if previous_format != self.history_log.FORMAT:
+                _, entries, _, _ = self.journal.read()
+                previous = open_history(previous_format, header.get("history_path"))
+                end = header["history_size"]
+                rounds = [entry["record"] for entry in entries if entry["type"] == "round"]
+                if rounds:
+                    # Journaled rounds go to the history they were written
+                    # for, and only their stats stay in the journal. Until
+                    # the journal is replaced this is redone from the start
+                    previous.recover(end)
+                    previous.append_many(rounds)
+                    previous.sync()
+                    end = previous.end_offset()
+                    entries = [{"type": "stats", "stats": entry["stats"]} if entry["type"] == "round"
+                               else entry for entry in entries]
+                # Rounds played since this history was last used only went
+                # to the other one
+                self.history_log.recover()
+                self._catch_up(previous, end)
+                self.journal.reset(entries, history_size=self.history_log.end_offset(),
+                                   history_format=self.history_log.FORMAT,
+                                   history_path=self.history_log.path,
+                                   spreadsheets=header.get("spreadsheets"))
+            else:
+                # Rounds past the recorded size come from a checkpoint that did
+                # not finish; they are still in the journal and will be rewritten
+                self.history_log.recover(header["history_size"])
+            self._opened = True
+
+    def _catch_up(self, previous, end):
+        """Append the rounds previous holds up to byte offset end that this
+        history lacks (lock held).
+
+        Only one history is written at a time, and each starts as a copy of
+        the other, so this one must match the start of previous; if it does
+        not, the two have diverged and neither is known to be complete.
+        """
+        if not os.path.exists(previous.path):
+            logger.warning("%s is missing, so %s may lack rounds played with it",
+                           previous.path, self.history_log.path)
+            return
+        try:
+            theirs = previous.records(end)
+            for index, record in enumerate(self.history_log.records()):
+                other = next(theirs, None)
+                if other is None or _round_key(other) != _round_key(record):
+                    raise RuntimeError(f"{self.history_log.path} and {previous.path} disagree from "
+                                       f"round {index}; remove the one that is wrong to rebuild it")
+            batch = []
+            for record in theirs:
+                batch.append(record)
+                if len(batch) == 65536:
+                    self.history_log.append_many(batch)
+                    batch = []
+            self.history_log.append_many(batch)
+            self.history_log.sync()
+        finally:
+            previous.close()
+
+    def _spreadsheet_signature(self):
+        signature = []
+        for path in (self.users_path, self.data_path):
+            stat = os.stat(path)
+            signature.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+        return signature
+
+    def _read_spreadsheets(self):
+        """(signature, users, stats) from the spreadsheets, read without the lock"""
+        import pandas as pd
+        while True:
+            signature = self._spreadsheet_signature()
+            users = pd.read_excel(self.users_path, dtype=str, keep_default_na=False)
+            stats = pd.read_excel(self.data_path)
+            # A checkpoint may have swapped a file in while it was read
+            if self._spreadsheet_signature() == signature:
+                break
+        users = {row["username"]: row for row in users.to_dict("records")}
+        stats_rows = {}
+        for row in stats.to_dict("records"):
+            username = str(row["username"])
+            stats_rows[username] = {"username": username, **{c: int(row[c]) for c in STATS_COLUMNS[1:]}}
+        return signature, users, stats_rows
+
+    @contextmanager
+    def _synced(self):
+        """Hold the lock with the in-memory state caught up with the journal.
+
+        When the journal was rotated past this process, the spreadsheets are
+        read before taking the lock, and only read under it if they changed
+        again in between.
+        """
+        self._open()
+        loaded = None
+        for attempt in range(2):
+            with self.lock:
+                if self._sync(loaded, reload=attempt == 1):
+                    yield
+                    return
+            loaded = self._read_spreadsheets()
+
+    def _sync(self, loaded=None, reload=True):
+        """Apply journal entries committed since the last call (lock held).
+
+        Returns False, without changing anything, when the spreadsheets have
+        to be loaded first and loaded is not them, unless reload is set.
+        """
+        header, entries, offset, continued = self.journal.read(self._generation, self._offset)
+        if header["generation"] != self._generation:
+            if continued:
+                # Rotated by a checkpoint that started from where this
+                # process already was: only the folded rounds go
+                self._history_size = header["history_size"]
+                self._rounds = [(o, record) for o, record in self._rounds if o >= self._history_size]
+                self._entries = len(self._rounds)
+            else:
+                # Replaying an entry twice changes nothing, so spreadsheets
+                # that already include part of the journal are fine
+                signature = header.get("spreadsheets")
+                if loaded is None or signature is None or loaded[0] != signature:
+                    if not reload:
+                        return False
+                    loaded = self._read_spreadsheets()
+                _, self._users, self._stats = loaded
+                self._history_size = self._history_end = header["history_size"]
+                self._rounds = []
+                self._entries = 0
+            self._generation = header["generation"]
+            self._history_format = header.get("history_format", "log")
+        self._offset = offset
+        for entry in entries:
+            self._apply(entry)
+        return True
+
+    def _apply(self, entry):
+        kind = entry["type"]
+        if kind == "user":
+            self._users[entry["user"]["username"]] = entry["user"]
+        elif kind == "login":
+            user = self._users.get(entry["username"])
+            if user is not None:
+                # Rows are replaced, never changed, so a checkpoint can write
+                # a shallow copy of the table out without the lock
+                self._users[entry["username"]] = dict(user, last_login=entry["timestamp"])
+        elif kind == "stats":
+            self._stats[entry["stats"]["username"]] = entry["stats"]
+        elif kind == "round":
+            self._stats[entry["stats"]["username"]] = entry["stats"]
+            self._rounds.append((self._history_end, entry["record"]))
+            self._history_end += self.history_log.record_size(entry["record"])
+        self._entries += 1
+
+    def _commit(self, entries):
+        """Make entries durable and apply them (lock held, state synced)"""
+        # An append plus fsync; the spreadsheets only catch up at checkpoints
+        self.journal.append(entries)
+        self._sync()
+        if self._entries >= self.CHECKPOINT_ENTRIES:
+            self._request_checkpoint()
+
+    def _request_checkpoint(self):
+        if self._checkpointer is None:
+            self._checkpointer = threading.Thread(target=self._run_checkpoints,
+                                                  name="excel-checkpoint", daemon=True)
+            self._checkpointer.start()
+        self._checkpoint_wanted.set()
+
+    def _run_checkpoints(self):
+        while True:
+            self._checkpoint_wanted.wait()
+            self._checkpoint_wanted.clear()
+            if self._closing:
+                return
+            try:
+                self.checkpoint(self.CHECKPOINT_ENTRIES)
+            except Exception:
+                logger.exception("Checkpoint failed, will retry on the next commit")
+
+    @timed("storage.excel.checkpoint")
+    def checkpoint(self, min_entries=1):
+        """Fold the journal into the spreadsheets and history log now,
+        if it holds at least min_entries entries"""
+        import pandas as pd
+        # Three steps: append the rounds to the history log under the lock,
+        # rewrite the spreadsheets without it, then rotate the journal to
+        # the entries committed meanwhile. Until the rotation the journal
+        # still holds everything, so a crash at any point is redone.
+        with self.checkpoint_lock:
+            with self._synced():
+                if self._entries < min_entries:
+                    return
+                offset = self._offset
+                history_end = self._history_end
+                # Start from the size recorded in the journal, dropping
+                # anything a previous, interrupted checkpoint left behind
+                self.history_log.truncate(self._history_size)
+                self.history_log.append_many([record for _, record in self._rounds])
+                self.history_log.sync()
+                tables = ((self.data_path, list(self._stats.values()), STATS_COLUMNS),
+                          (self.users_path, list(self._users.values()), USER_COLUMNS))
+
+            # The slow part: writers carry on meanwhile. Each file is
+            # replaced atomically, so readers see the old or the new one
+            for path, rows, columns in tables:
+                root, ext = os.path.splitext(path)
+                tmp_path = root + ".tmp" + ext
+                pd.DataFrame(rows, columns=columns).to_excel(tmp_path, index=False)
+                os.replace(tmp_path, path)
+
+            with self.lock:
+                # Nothing else rotates while the checkpoint lock is held, so
+                # the journal is still the one read above
+                self.journal.rotate(offset, history_size=history_end,
+                                    history_format=self.history_log.FORMAT,
+                                    history_path=self.history_log.path,
+                                    spreadsheets=self._spreadsheet_signature())
+                self._sync()
+                if self.snapshots is not None:
+                    self.snapshots.compact(self.history_log, history_end)
+
+    @timed("storage.excel.get_user")
+    def get_user(self, username):
+        with self._synced():
+            user = self._users.get(username)
+        return dict(user) if user is not None else None
+
+    @timed("storage.excel.add_user")
+    def add_user(self, user):
+        with self._synced():
+            if user["username"] in self._users:
+                return False
+            self._commit([{"type": "user", "user": {c: user[c] for c in USER_COLUMNS}}])
+        return True
+
+    @timed("storage.excel.update_last_login")
+    def update_last_login(self, username, timestamp):
+        with self._synced():
+            if username in self._users:
+                self._commit([{"type": "login", "username": username, "timestamp": timestamp}])
+
+    @timed("storage.excel.get_stats")
+    def get_stats(self, username):
+        with self._synced():
+            stats = self._stats.get(username)
+        return dict(stats) if stats is not None else None
+
+    @timed("storage.excel.create_stats")
+    def create_stats(self, username):
+        with self._synced():
+            if username not in self._stats:
+                self._commit([{"type": "stats", "stats": empty_stats(username)}])
+
+    def iter_stats(self):
+        with self._synced():
+            rows = [dict(stats) for stats in self._stats.values()]
+        return iter(rows)
+
+    @timed("storage.excel.save_round")
+    def save_round(self, stats, record):
+        self.save_rounds([(stats, record)])
+
+    @timed("storage.excel.save_rounds")
+    def save_rounds(self, rounds):
+        if not rounds:
+            return
+        with self._synced():
+            # Stats are the latest committed row plus each round, not the
+            # caller's copy, so rounds from other processes are kept
+            latest = {}
+            entries = []
+            for _, record in rounds:
+                username = record["username"]
+                stats = dict(latest.get(username) or self._stats.get(username) or empty_stats(username))
+                stats["total_games"] += 1
+                if record["result"] == "wins":
+                    stats["wins"] += 1
+                stats[record["player"].lower()] += 1
+                latest[username] = stats
+                entries.append({"type": "round", "stats": stats,
+                                "record": {c: record[c] for c in HISTORY_COLUMNS}})
+            self._commit(entries)
+
+    @timed("storage.excel.load_history")
+    def load_history(self, username):
+        with self._synced():
+            records = self.history_log.read(username, end=self._history_size)
+            return records + [record for _, record in self._rounds if record["username"] == username]
+
+    def history_cursor(self):
+        with self._synced():
+            return self._history_end
+
+    @timed("storage.excel.load_results")
+    def load_results(self, username):
+        with self._synced():
+            if self.snapshots is None:
+                codes = self.history_log.results(username, self._history_size)
+                return codes + result_codes(record for _, record in self._rounds if record["username"] == username)
+            if self._history_size - self.snapshots.compacted_offset() > self.COMPACT_BYTES:
+                self.snapshots.compact(self.history_log, self._history_size)
+            return self.snapshots.results(username, self.history_log, self._history_size, self._rounds)
+
+    @timed("storage.excel.load_history_page")
+    def load_history_page(self, username, before=None, limit=50):
+        with self._synced():
+            if before is None:
+                before = self._history_end
+            # Rounds still in the journal sit after everything in the log
+            records = []
+            for offset, record in reversed(self._rounds):
+                if offset < before and record["username"] == username:
+                    records.append(record)
+                    if len(records) == limit:
+                        return records, offset
+            older, cursor = self.history_log.read_page(
+                username, min(before, self._history_size), limit - len(records))
+            return records + older, cursor
+
+    def iter_history(self):
+        with self._synced():
+            end = self._history_size
+            rounds = [record for _, record in self._rounds]
+        yield from self.history_log.records(end)
+        yield from rounds
+
+    def close(self):
+        if self._checkpointer is not None:
+            self._closing = True
+            self._checkpoint_wanted.set()
+            self._checkpointer.join()
+        # The journal is already durable; the next process, or its
+        # checkpointer, folds it in unless it is due now anyway
+        if self._opened:
+            self.checkpoint(self.CHECKPOINT_ENTRIES)
+        self.history_log.close()
+        self.lock.close()
+        self.checkpoint_lock.close()
+
+
+class SQLiteStorage(Storage):
+    """SQLite backend with indexed lookups and single-row transactional writes.
+
+    The database runs in WAL mode, so readers in other processes never block
+    the writer, and writers queue for up to BUSY_TIMEOUT_MS instead of
+    failing. Stats are updated by increments inside the round's
+    transaction, so concurrent writers cannot lose each other's rounds.
+
+    Each user's round results are also kept as a snapshot blob with the
+    last history id it covers; loading results reads only the rows after
+    it, and folds them in once there are SNAPSHOT_TAIL of them.
+    """
+
+    # How long a writer waits for another process's transaction to finish
+    BUSY_TIMEOUT_MS = 10000
+    # History rows past a user's snapshot that trigger folding them into it
+    SNAPSHOT_TAIL = 1000
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            email TEXT,
+            created_at TEXT,
+            last_login TEXT
+        );
+        CREATE TABLE IF NOT EXISTS stats (
+            username TEXT PRIMARY KEY,
+            total_games INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            rock INTEGER NOT NULL DEFAULT 0,
+            paper INTEGER NOT NULL DEFAULT 0,
+            scissors INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            datetime TEXT NOT NULL,
+            player TEXT NOT NULL,
+            computer TEXT NOT NULL,
+            result TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_user_time ON history (username, datetime);
+        CREATE INDEX IF NOT EXISTS idx_history_user_id ON history (username, id);
+        CREATE TABLE IF NOT EXISTS snapshots (
+            username TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL,
+            results BLOB NOT NULL
+        );
+    """
+
+    def __init__(self, db_path="rps.db"):
+        self.db_path = db_path
+        # Writes may come from a write-behind flusher thread
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=self.BUSY_TIMEOUT_MS / 1000)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"PRAGMA busy_timeout = {self.BUSY_TIMEOUT_MS}")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        # Commits survive a process crash; fsync happens at checkpoints
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        with self.conn:
+            self.conn.executescript(self.SCHEMA)
+
+    @timed("storage.sqlite.get_user")
+    def get_user(self, username):
+        row = self.conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        return dict(row) if row is not None else None
+
+    @timed("storage.sqlite.add_user")
+    def add_user(self, user):
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO users (username, password, email, created_at, last_login) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [user[c] for c in USER_COLUMNS],
+                )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    @timed("storage.sqlite.update_last_login")
+    def update_last_login(self, username, timestamp):
+        with self.conn:
+            self.conn.execute("UPDATE users SET last_login = ? WHERE username = ?", (timestamp, username))
+
+    @timed("storage.sqlite.get_stats")
+    def get_stats(self, username):
+        row = self.conn.execute("SELECT * FROM stats WHERE username = ?", (username,)).fetchone()
+        return dict(row) if row is not None else None
+
+    @timed("storage.sqlite.create_stats")
+    def create_stats(self, username):
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO stats (username) VALUES (?)", (username,))
+
+    def iter_stats(self):
+        for row in self.conn.execute("SELECT * FROM stats"):
+            yield dict(row)
+
+    @timed("storage.sqlite.save_round")
+    def save_round(self, stats, record):
+        self.save_rounds([(stats, record)])
+
+    @timed("storage.sqlite.save_rounds")
+    def save_rounds(self, rounds):
+        if not rounds:
+            return
+        # Add each user's rounds to the stored counts rather than writing the
+        # caller's totals, which another process may have moved past
+        increments = {}
+        for _, record in rounds:
+            counts = increments.setdefault(record["username"], empty_stats(record["username"]))
+            counts["total_games"] += 1
+            counts["wins"] += int(record["result"] == "wins")
+            counts[record["player"].lower()] += 1
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE stats SET total_games = total_games + ?, wins = wins + ?, rock = rock + ?, "
+                "paper = paper + ?, scissors = scissors + ? WHERE username = ?",
+                [[counts[c] for c in STATS_COLUMNS[1:]] + [username] for username, counts in increments.items()],
+            )
+            self.conn.executemany(
+                "INSERT INTO history (username, datetime, player, computer, result) VALUES (?, ?, ?, ?, ?)",
+                [[record[c] for c in HISTORY_COLUMNS] for _, record in rounds],
+            )
+
+    @timed("storage.sqlite.load_history")
+    def load_history(self, username):
+        rows = self.conn.execute(
+            "SELECT username, datetime, player, computer, result FROM history "
+            "WHERE username = ? ORDER BY datetime, id",
+            (username,),
+        )
+        return [dict(row) for row in rows]
+
+    def history_cursor(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM history").fetchone()[0]
+
+    @timed("storage.sqlite.load_results")
+    def load_results(self, username):
+        row = self.conn.execute("SELECT last_id, results FROM snapshots WHERE username = ?", (username,)).fetchone()
+        last_id, codes = (row["last_id"], bytes(row["results"])) if row is not None else (0, b"")
+        tail = self.conn.execute(
+            "SELECT id, result FROM history WHERE username = ? AND id > ? ORDER BY id",
+            (username, last_id),
+        ).fetchall()
+        codes += result_codes(tail)
+        if len(tail) >= self.SNAPSHOT_TAIL:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO snapshots (username, last_id, results) VALUES (?, ?, ?)",
+                    (username, tail[-1]["id"], codes))
+        return codes
+
+    @timed("storage.sqlite.load_history_page")
+    def load_history_page(self, username, before=None, limit=50):
+        if before is None:
+            before = self.history_cursor()
+        rows = self.conn.execute(
+            "SELECT id, username, datetime, player, computer, result FROM history "
+            "WHERE username = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (username, before, limit),
+        ).fetchall()
+        records = [{c: row[c] for c in HISTORY_COLUMNS} for row in rows]
+        cursor = rows[-1]["id"] if len(rows) == limit else None
+        return records, cursor
+
+    def iter_history(self):
+        rows = self.conn.execute(
+            "SELECT username, datetime, player, computer, result FROM history ORDER BY id"
+        )
+        for row in rows:
+            yield dict(row)
+
+    def close(self):
+        self.conn.close()
+
+
+def _round_key(record):
+    # What both history formats keep of a round
+    return (str(record["username"]), str(record["datetime"])[:19], record["player"].lower(),
+            record["computer"].lower(), record["result"])
+
+
+def open_history(history_format, path=None):
+    """An existing history of the given format, at path or its default one"""
+    if history_format == "binary":
+        from binary_history import BinaryHistoryLog
+        return BinaryHistoryLog(path or "game_history.bin", legacy_log=None, legacy_path=None)
+    return HistoryLog(path or "game_history.log", legacy_path=None)
+
+
+def binary_excel_storage(**kwargs):
+    """ExcelStorage keeping game history in a BinaryHistoryLog"""
+    from binary_history import BinaryHistoryLog
+    if kwargs.get("history_log") is None:
+        kwargs["history_log"] = BinaryHistoryLog()
+    return ExcelStorage(**kwargs)
+
+
+BACKENDS = {
+    "excel": ExcelStorage,
+    "binary": binary_excel_storage,
+    "sqlite": SQLiteStorage,
+}
+
+
+def open_storage(backend="excel", **kwargs):
+    """Create a storage backend by name ("excel", "binary" or "sqlite").
+
+    "binary" is the spreadsheet backend with history in the fixed-width
+    binary file (see binary_history.py) instead of the JSON-lines log.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return BACKENDS[backend](**kwargs)
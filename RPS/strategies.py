@@ -0,0 +1,296 @@
+import numpy as np
+from simulation import encode_moves, resolve
+
+
+def beat(move):
+    """Code of the move that beats move"""
+    return (move + 1) % 3
+
+
+class Strategy:
+    """A computer player.
+
+    Fixed strategies (adaptive = False) produce their whole move sequence up
+    front through moves(n), so matches between them resolve in bulk.
+    Adaptive strategies pick one move at a time with next_move() and learn
+    from observe() after every round.
+    """
+
+    name = "strategy"
+    adaptive = False
+
+    def reset(self):
+        """Forget everything learned in a previous match"""
+
+    def moves(self, n):
+        """The next n moves as an int8 array of codes (fixed strategies)"""
+        raise NotImplementedError
+
+    def next_move(self):
+        """Code of the next move (adaptive strategies)"""
+        raise NotImplementedError
+
+    def observe(self, own_move, opponent_move):
+        """Learn from the round just played (adaptive strategies)"""
+
+    def warm_start(self, opponent_moves):
+        """Learn from the opponent's past moves, oldest first, before playing.
+
+        This default replays them one at a time; strategies with count
+        tables override it with a single vectorized pass.
+        """
+        for move in encode_moves(opponent_moves).tolist():
+            self.observe(self.next_move(), move)
+
+
+class RandomStrategy(Strategy):
+    def __init__(self, seed=None, name="random"):
+        self.seed = seed
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self._rng = np.random.default_rng(self.seed)
+
+    def moves(self, n):
+        return self._rng.integers(0, 3, size=n, dtype=np.int8)
+
+
+class CycleStrategy(Strategy):
+    """Repeats a fixed sequence of moves, e.g. ['rock'] or rock-paper-scissors"""
+
+    def __init__(self, sequence, name=None):
+        self.sequence = encode_moves(sequence)
+        self.name = name or "cycle-" + "".join(move[0] for move in sequence)
+        self.reset()
+
+    def reset(self):
+        self._position = 0
+
+    def moves(self, n):
+        start = self._position
+        self._position = (start + n) % len(self.sequence)
+        return np.resize(np.roll(self.sequence, -start), n)
+
+
+class RecordedStrategy(CycleStrategy):
+    """Replays a human's recorded moves, wrapping around at the end"""
+
+    def __init__(self, moves, name="recorded"):
+        if len(moves) == 0:
+            raise ValueError("Recorded history is empty")
+        super().__init__(moves, name=name)
+
+    @classmethod
+    def from_storage(cls, storage, username):
+        """Build from everything username has played, oldest first"""
+        moves = [record["player"] for record in storage.load_history(username)]
+        return cls(moves, name=f"human-{username}")
+
+
+class FrequencyStrategy(Strategy):
+    """Counters the opponent's most frequent move so far"""
+
+    adaptive = True
+
+    def __init__(self, name="frequency"):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.counts = [0, 0, 0]
+
+    def next_move(self):
+        counts = self.counts
+        return beat(counts.index(max(counts)))
+
+    def observe(self, own_move, opponent_move):
+        self.counts[opponent_move] += 1
+
+    def warm_start(self, opponent_moves):
+        counts = np.bincount(encode_moves(opponent_moves), minlength=3)
+        self.counts = [c + int(n) for c, n in zip(self.counts, counts)]
+
+
+class MarkovStrategy(Strategy):
+    """Predicts the opponent's next move from their last `order` moves.
+
+    Transition counts live in a fixed (3 ** order, 3) table, so updates are
+    O(1) and memory does not grow with the length of the match.
+    """
+
+    adaptive = True
+
+    def __init__(self, order=1, name=None):
+        self.order = order
+        self.name = name or f"markov-{order}"
+        self.reset()
+
+    def reset(self):
+        self.table = np.zeros((3 ** self.order, 3), dtype=np.int64)
+        self.context = 0
+        self.seen = 0
+
+    def next_move(self):
+        if self.seen < self.order:
+            return 0
+        row = self.table[self.context]
+        return beat(int(row.argmax()))
+
+    def observe(self, own_move, opponent_move):
+        if self.seen >= self.order:
+            self.table[self.context, opponent_move] += 1
+        # Slide the window of the last `order` moves, encoded in base 3
+        self.context = (self.context * 3 + opponent_move) % (3 ** self.order)
+        self.seen += 1
+
+    def warm_start(self, opponent_moves):
+        """Fill the table from a whole history in one pass instead of replaying it"""
+        moves = encode_moves(opponent_moves).astype(np.int64)
+        n = len(moves)
+        if n == 0:
+            return
+        # Fold in the moves that complete the current partial window first
+        lead = max(min(self.order - self.seen, n), 0)
+        for move in moves[:lead].tolist():
+            self.observe(0, move)
+        moves = moves[lead:]
+        if len(moves) == 0:
+            return
+
+        # Context before each move: the previous `order` moves in base 3,
+        # continuing from the context already held
+        history = np.concatenate([self._context_digits(), moves])
+        contexts = np.zeros(len(moves), dtype=np.int64)
+        for k in range(self.order):
+            contexts = contexts * 3 + history[k:k + len(moves)]
+        size = 3 ** self.order
+        self.table += np.bincount(contexts * 3 + moves, minlength=size * 3).reshape(size, 3)
+        self.context = int((contexts[-1] * 3 + moves[-1]) % size)
+        self.seen += len(moves)
+
+    def _context_digits(self):
+        """The current context as its `order` base-3 digits, oldest first"""
+        digits = []
+        context = self.context
+        for _ in range(self.order):
+            digits.append(context % 3)
+            context //= 3
+        return np.array(digits[::-1], dtype=np.int64)
+
+
+class PatternStrategy(Strategy):
+    """Finds the longest recent run of opponent moves seen before and
+    counters whatever followed it last time.
+
+    Only the last max_length moves are kept and successors are stored per
+    pattern, so memory is bounded by 3 ** max_length patterns per length.
+    """
+
+    adaptive = True
+
+    def __init__(self, max_length=5, name=None):
+        self.max_length = max_length
+        self.name = name or f"pattern-{max_length}"
+        self.reset()
+
+    def reset(self):
+        self.recent = ()
+        self.followers = {}
+
+    def next_move(self):
+        for length in range(min(self.max_length, len(self.recent)), 0, -1):
+            following = self.followers.get(self.recent[-length:])
+            if following is not None:
+                return beat(following)
+        return 0
+
+    def observe(self, own_move, opponent_move):
+        for length in range(1, min(self.max_length, len(self.recent)) + 1):
+            self.followers[self.recent[-length:]] = opponent_move
+        self.recent = (self.recent + (opponent_move,))[-self.max_length:]
+
+    def warm_start(self, opponent_moves):
+        """Record what last followed every run in one pass per run length"""
+        moves = encode_moves(opponent_moves).astype(np.int64)
+        if len(moves) == 0:
+            return
+        history = np.concatenate([np.array(self.recent, dtype=np.int64), moves])
+        first = len(self.recent)
+        for length in range(1, self.max_length + 1):
+            # Each new move at position i follows the run history[i - length:i]
+            positions = np.arange(max(first, length), len(history))
+            if len(positions) == 0:
+                continue
+            codes = np.zeros(len(positions), dtype=np.int64)
+            for k in range(length):
+                codes = codes * 3 + history[positions - length + k]
+            # Later rounds overwrite earlier ones, so keep each run's last follower
+            runs, last = np.unique(codes[::-1], return_index=True)
+            followers = history[positions[len(positions) - 1 - last]]
+            for code, follower in zip(runs.tolist(), followers.tolist()):
+                self.followers[self._run(code, length)] = follower
+        self.recent = tuple(history[-self.max_length:].tolist())
+
+    @staticmethod
+    def _run(code, length):
+        """The run of length moves encoded in base 3 as code, oldest first"""
+        digits = []
+        for _ in range(length):
+            digits.append(code % 3)
+            code //= 3
+        return tuple(digits[::-1])
+
+
+def play_match(a, b, rounds):
+    """Play rounds between two strategies, returning result codes from a's side"""
+    a.reset()
+    b.reset()
+    if not a.adaptive and not b.adaptive:
+        # Both sequences are known up front: resolve the whole match at once
+        return resolve(a.moves(rounds), b.moves(rounds))
+
+    # Fixed players still draw their moves in bulk; only adaptive ones step
+    a_fixed = None if a.adaptive else a.moves(rounds).tolist()
+    b_fixed = None if b.adaptive else b.moves(rounds).tolist()
+    a_moves = [0] * rounds
+    b_moves = [0] * rounds
+    for i in range(rounds):
+        move_a = a.next_move() if a_fixed is None else a_fixed[i]
+        move_b = b.next_move() if b_fixed is None else b_fixed[i]
+        a_moves[i] = move_a
+        b_moves[i] = move_b
+        a.observe(move_a, move_b)
+        b.observe(move_b, move_a)
+    return resolve(np.array(a_moves, dtype=np.int8), np.array(b_moves, dtype=np.int8))
+
+
+# Computer opponents that can be chosen for RPSGame, by name
+OPPONENTS = {
+    'markov': lambda: MarkovStrategy(order=2),
+    'frequency': FrequencyStrategy,
+    'pattern': PatternStrategy,
+}
+
+
+def make_opponent(name):
+    """A fresh adaptive opponent, or None for the default random computer"""
+    if not name or name == 'random':
+        return None
+    if name not in OPPONENTS:
+        raise ValueError(f"Unknown opponent: {name}")
+    return OPPONENTS[name]()
+
+
+def default_strategies(seed=0):
+    """The built-in field used when no strategies are named"""
+    return [
+        RandomStrategy(seed=seed),
+        CycleStrategy(['rock'], name="always-rock"),
+        CycleStrategy(['rock', 'paper', 'scissors']),
+        CycleStrategy(['rock', 'rock', 'paper', 'scissors', 'scissors']),
+        FrequencyStrategy(),
+        MarkovStrategy(order=1),
+        MarkovStrategy(order=2),
+        PatternStrategy(max_length=5),
+    ]
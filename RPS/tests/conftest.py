@@ -0,0 +1,36 @@
+import os
+import sys
+import pytest
+
+# The game modules live next to this directory and are imported flat
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from binary_history import BinaryHistoryLog  # noqa: E402
+from history_log import HistoryLog  # noqa: E402
+from storage import ExcelStorage, empty_stats  # noqa: E402
+
+
+@pytest.fixture
+def open_storage(tmp_path):
+    """Opens an ExcelStorage over files in tmp_path, with the text or binary history"""
+    def open_storage(history_format="log"):
+        if history_format == "binary":
+            history_log = BinaryHistoryLog(str(tmp_path / "game_history.bin"),
+                                           legacy_log=str(tmp_path / "game_history.log"), legacy_path=None)
+        else:
+            history_log = HistoryLog(str(tmp_path / "game_history.log"), legacy_path=None)
+        return ExcelStorage(
+            users_path=str(tmp_path / "users.xlsx"), data_path=str(tmp_path / "game_data.xlsx"),
+            history_log=history_log, journal_path=str(tmp_path / "rps.journal"),
+            snapshot_dir=str(tmp_path / "stats_snapshots"))
+    return open_storage
+
+
+@pytest.fixture
+def play():
+    """Saves n rounds for username in one batch"""
+    def play(storage, username, n, result="wins"):
+        storage.save_rounds([(empty_stats(username), {
+            "username": username, "datetime": "2024-01-01 00:00:00",
+            "player": "rock", "computer": "scissors", "result": result}) for _ in range(n)])
+    return play
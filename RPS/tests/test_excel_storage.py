@@ -0,0 +1,138 @@
+import pandas as pd
+import pytest
+from history_log import HistoryLog
+
+
+def add_user(storage, username):
+    return storage.add_user({"username": username, "password": "x", "email": "",
+                             "created_at": "2024-01-01 00:00:00", "last_login": ""})
+
+
+def test_other_instances_replay_the_journal(tmp_path, open_storage, play):
+    writer, reader = open_storage(), open_storage()
+    add_user(writer, "amy")
+    play(writer, "amy", 3)
+
+    assert reader.get_user("amy") is not None
+    assert reader.get_stats("amy")["total_games"] == 3
+    assert len(reader.load_history("amy")) == 3
+    # Neither has checkpointed, so the workbooks are still empty
+    assert len(pd.read_excel(tmp_path / "game_data.xlsx")) == 0
+    writer.close()
+    reader.close()
+
+
+def test_crash_during_checkpoint_loses_nothing(monkeypatch, open_storage, play):
+    storage = open_storage()
+    add_user(storage, "amy")
+    play(storage, "amy", 5)
+
+    # The rounds reach the log, then the process dies rewriting the workbooks
+    def crash(*args, **kwargs):
+        raise RuntimeError("killed")
+    monkeypatch.setattr(pd.DataFrame, "to_excel", crash)
+    with pytest.raises(RuntimeError):
+        storage.checkpoint()
+    monkeypatch.undo()
+
+    recovered = open_storage()
+    play(recovered, "amy", 2)
+    assert recovered.get_stats("amy")["total_games"] == 7
+    assert len(recovered.load_history("amy")) == 7
+    recovered.close()
+
+    reopened = open_storage()
+    assert reopened.get_stats("amy")["total_games"] == 7
+    assert len(reopened.load_history("amy")) == 7
+    assert len(reopened.load_results("amy")) == 7
+    reopened.close()
+
+
+def test_checkpoint_keeps_rounds_committed_meanwhile(monkeypatch, open_storage, play):
+    storage, other = open_storage(), open_storage()
+    play(storage, "amy", 4)
+    other.get_stats("amy")
+
+    # Another process commits while the workbooks are being rewritten
+    to_excel = pd.DataFrame.to_excel
+    def slow_write(self, *args, **kwargs):
+        monkeypatch.setattr(pd.DataFrame, "to_excel", to_excel)
+        play(other, "amy", 3)
+        return to_excel(self, *args, **kwargs)
+    monkeypatch.setattr(pd.DataFrame, "to_excel", slow_write)
+    storage.checkpoint()
+
+    assert storage.get_stats("amy")["total_games"] == 7
+    assert len(storage.load_history("amy")) == 7
+    assert other.get_stats("amy")["total_games"] == 7
+    assert len(other.load_history("amy")) == 7
+    storage.close()
+    other.close()
+    assert len(open_storage().load_history("amy")) == 7
+
+
+def test_torn_journal_and_log_tails_are_repaired(tmp_path, open_storage, play):
+    storage = open_storage()
+    play(storage, "amy", 3)
+    storage.close()
+    play_more = open_storage()
+    play(play_more, "amy", 1)
+    play_more.history_log.close()
+    play_more.lock.close()
+    with open(tmp_path / "rps.journal", "ab") as f:
+        f.write(b'{"type": "round", "st')
+    with open(tmp_path / "game_history.log", "ab") as f:
+        f.write(b'{"username": "amy", "da')
+
+    recovered = open_storage()
+    assert recovered.get_stats("amy")["total_games"] == 4
+    play(recovered, "amy", 1)
+    recovered.close()
+    reopened = open_storage()
+    assert len(reopened.load_history("amy")) == 5
+    assert reopened.get_stats("amy")["total_games"] == 5
+    reopened.close()
+
+
+def test_opening_reads_nothing(tmp_path, open_storage):
+    storage = open_storage()
+    assert not (tmp_path / "rps.journal").exists()
+    storage.close()
+
+
+def test_compaction_ahead_of_the_journal_is_not_counted_twice(tmp_path, open_storage, play):
+    storage = open_storage()
+    play(storage, "amy", 2)
+    storage.checkpoint()
+    play(storage, "amy", 3)
+    storage.history_log.close()
+    storage.lock.close()
+
+    # A checkpoint wrote the journaled rounds to the log and compacted the
+    # snapshots over them, then died before rotating the journal
+    log = HistoryLog(str(tmp_path / "game_history.log"), legacy_path=None)
+    log.append_many([record for _, record in storage._rounds])
+    storage.snapshots.compact(log, log.end_offset())
+    log.close()
+
+    recovered = open_storage()
+    assert len(recovered.load_results("amy")) == 5
+    play(recovered, "amy", 1)
+    assert len(recovered.load_results("amy")) == 6
+    recovered.checkpoint()
+    assert len(recovered.load_results("amy")) == 6
+    recovered.close()
+
+
+def test_close_leaves_a_short_journal_alone(tmp_path, open_storage, play):
+    storage = open_storage()
+    add_user(storage, "amy")
+    play(storage, "amy", 2)
+    before = [(tmp_path / name).stat().st_mtime_ns for name in ("users.xlsx", "game_data.xlsx")]
+    storage.close()
+    assert [(tmp_path / name).stat().st_mtime_ns for name in ("users.xlsx", "game_data.xlsx")] == before
+
+    reopened = open_storage()
+    assert reopened.get_stats("amy")["total_games"] == 2
+    assert len(reopened.load_history("amy")) == 2
+    reopened.close()
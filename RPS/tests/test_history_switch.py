@@ -0,0 +1,35 @@
+import pytest
+from history_log import HistoryLog
+
+
+def test_switching_formats_carries_every_round_over(open_storage, play):
+    for history_format, n in (("log", 2), ("binary", 3), ("log", 4), ("binary", 5)):
+        storage = open_storage(history_format)
+        play(storage, "amy", n)
+        storage.close()
+
+    total = 2 + 3 + 4 + 5
+    for history_format in ("log", "binary"):
+        storage = open_storage(history_format)
+        assert len(storage.load_history("amy")) == total
+        assert len(storage.load_results("amy")) == total
+        assert storage.get_stats("amy")["total_games"] == total
+        storage.close()
+
+
+def test_diverged_histories_are_refused(tmp_path, open_storage, play):
+    storage = open_storage("log")
+    play(storage, "amy", 2)
+    storage.close()
+    storage = open_storage("binary")
+    play(storage, "amy", 1)
+    storage.close()
+
+    # Something other than the storage wrote to the log meanwhile
+    log = HistoryLog(str(tmp_path / "game_history.log"), legacy_path=None)
+    log.append_many([{"username": "bob", "datetime": "2024-01-02 00:00:00",
+                      "player": "paper", "computer": "rock", "result": "wins"}])
+    log.close()
+
+    with pytest.raises(RuntimeError, match="disagree"):
+        open_storage("log").get_stats("amy")
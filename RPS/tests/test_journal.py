@@ -0,0 +1,42 @@
+from journal import Journal
+
+
+def test_torn_tail_is_left_unread_and_dropped_on_append(tmp_path):
+    journal = Journal(str(tmp_path / "rps.journal"))
+    header = journal.reset(history_size=0)
+    journal.append([{"n": 1}, {"n": 2}])
+    with open(journal.path, "ab") as f:
+        f.write(b'{"n": 3')  # a writer died mid-append
+
+    _, entries, offset, continued = journal.read(header["generation"], None)
+    assert entries == [{"n": 1}, {"n": 2}]
+    assert not continued
+
+    journal.append([{"n": 4}])
+    _, entries, _, continued = journal.read(header["generation"], offset)
+    assert entries == [{"n": 4}]
+    assert continued
+
+
+def test_rotate_keeps_later_entries_for_readers_that_caught_up(tmp_path):
+    journal = Journal(str(tmp_path / "rps.journal"))
+    header = journal.reset(history_size=0)
+    journal.append([{"n": 1}])
+    _, _, folded, _ = journal.read(header["generation"], None)
+    journal.append([{"n": 2}])
+    _, _, caught_up, _ = journal.read(header["generation"], folded)
+
+    rotated = journal.rotate(folded, history_size=10)
+    assert rotated["previous"] == header["generation"]
+    journal.append([{"n": 3}])
+
+    # A reader past the rotation point only sees what it has not read
+    new_header, entries, _, continued = journal.read(header["generation"], caught_up)
+    assert new_header["history_size"] == 10
+    assert entries == [{"n": 3}]
+    assert continued
+
+    # A reader from an older generation starts over with the kept entries
+    _, entries, _, continued = journal.read("stale", 0)
+    assert entries == [{"n": 2}, {"n": 3}]
+    assert not continued
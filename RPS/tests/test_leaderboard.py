@@ -0,0 +1,51 @@
+import random
+from leaderboard import BOARDS, Leaderboard
+from storage import empty_stats
+
+
+class Rows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def iter_stats(self):
+        return iter(self.rows)
+
+
+def expected_top(rows, board, n, min_games):
+    keys = []
+    for stats in rows.values():
+        total, wins = stats["total_games"], stats["wins"]
+        if board == 'wins':
+            keys.append((-wins, stats["username"]))
+        elif board == 'games':
+            keys.append((-total, stats["username"]))
+        elif total >= min_games:
+            keys.append((-(wins / total), stats["username"]))
+    return [username for _, username in sorted(keys)[:n]]
+
+
+def test_updates_match_a_full_sort():
+    rng = random.Random(7)
+    rows = {}
+    for i in range(50):
+        stats = empty_stats(f"p{i}")
+        stats["total_games"] = rng.randrange(20)
+        stats["wins"] = rng.randrange(stats["total_games"] + 1)
+        rows[stats["username"]] = stats
+    leaderboard = Leaderboard.from_storage(Rows(list(rows.values())), min_games=5)
+
+    for step in range(2000):
+        stats = dict(rows[f"p{rng.randrange(60) % 50}"])
+        # Scores go up and down, so users often return to an earlier key
+        stats["total_games"] = max(stats["total_games"] + rng.choice((-1, 1)), 0)
+        stats["wins"] = min(rng.randrange(stats["total_games"] + 1), stats["total_games"])
+        rows[stats["username"]] = stats
+        leaderboard.update(stats)
+        if step % 50 == 0:
+            for board in BOARDS:
+                top = [entry["username"] for entry in leaderboard.top(board, 10)]
+                assert top == expected_top(rows, board, 10, 5)
+
+    for board in BOARDS:
+        assert len(leaderboard._boards[board]) <= 2 * len(rows) + 16
+    assert leaderboard.totals()["total_games"] == sum(s["total_games"] for s in rows.values())
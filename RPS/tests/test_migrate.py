@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import pandas as pd
+import pytest
+from benchmark import write_xlsx
+from history_log import HISTORY_COLUMNS
+from migrate import migrate
+from storage import STATS_COLUMNS, USER_COLUMNS
+
+
+def forbid_read_excel(monkeypatch):
+    """Fail the test if a workbook is parsed whole into memory from now on"""
+    def read_excel(*args, **kwargs):
+        raise AssertionError("pandas.read_excel called")
+    monkeypatch.setattr(pd, "read_excel", read_excel)
+
+
+def count(db, sql):
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute(sql).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_legacy_workbooks_are_streamed_and_left_alone(tmp_path, monkeypatch):
+    forbid_read_excel(monkeypatch)
+    monkeypatch.chdir(tmp_path)
+    write_xlsx("users.xlsx", USER_COLUMNS, [["amy", "x", "", "2024-01-01 00:00:00", ""]])
+    write_xlsx("game_data.xlsx", STATS_COLUMNS, [["amy", 2, 1, 2, 0, 0]])
+    write_xlsx("game_history.xlsx", HISTORY_COLUMNS,
+               [["amy", "2024-01-01 00:00:00", "rock", "scissors", "wins"]] * 2)
+    before = sorted(os.listdir())
+
+    migrate("rps.db", log=lambda message: None)
+    assert count("rps.db", "SELECT COUNT(*) FROM users") == 1
+    assert count("rps.db", "SELECT total_games FROM stats") == 2
+    assert count("rps.db", "SELECT COUNT(*) FROM history") == 2
+    assert sorted(os.listdir()) == sorted(before + ["rps.db"])
+
+
+def test_rounds_still_in_the_journal_are_migrated(tmp_path, open_storage, play, monkeypatch):
+    storage = open_storage()
+    storage.add_user({"username": "amy", "password": "x", "email": "",
+                      "created_at": "2024-01-01 00:00:00", "last_login": ""})
+    play(storage, "amy", 3)
+    storage.checkpoint()
+    play(storage, "amy", 4)
+    storage.update_last_login("amy", "2024-02-01 00:00:00")
+
+    monkeypatch.chdir(tmp_path)
+    forbid_read_excel(monkeypatch)
+    migrate("rps.db", log=lambda message: None)
+    assert count("rps.db", "SELECT COUNT(*) FROM users") == 1
+    assert count("rps.db", "SELECT last_login FROM users") == "2024-02-01 00:00:00"
+    assert count("rps.db", "SELECT total_games FROM stats") == 7
+    assert count("rps.db", "SELECT COUNT(*) FROM history") == 7
+
+    # Nothing more is applied on a second run, and --restart starts over cleanly
+    migrate("rps.db", log=lambda message: None)
+    assert count("rps.db", "SELECT COUNT(*) FROM history") == 7
+    migrate("rps.db", restart=True, log=lambda message: None)
+    assert count("rps.db", "SELECT COUNT(*) FROM history") == 7
+    storage.close()
+
+
+def test_interrupted_history_copy_resumes(tmp_path, open_storage, play, monkeypatch):
+    storage = open_storage()
+    play(storage, "amy", 5)
+    storage.checkpoint()
+    monkeypatch.chdir(tmp_path)
+
+    def stop_after_first_batch(message):
+        if message.startswith("history: 2 "):
+            raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        migrate("rps.db", batch_size=2, log=stop_after_first_batch)
+    assert count("rps.db", "SELECT COUNT(*) FROM history") == 2
+
+    play(storage, "amy", 1)
+    migrate("rps.db", batch_size=2, log=lambda message: None)
+    assert count("rps.db", "SELECT COUNT(*) FROM history") == 6
+    storage.close()
@@ -0,0 +1,32 @@
+from game_utils import PagedHistory
+
+
+def test_deep_reads_load_in_one_call(open_storage, play, monkeypatch):
+    storage = open_storage()
+    play(storage, "amy", 30, result="wins")
+    play(storage, "bob", 5)
+    play(storage, "amy", 30, result="losses")
+    storage.checkpoint()
+
+    calls = []
+    load_history_page = storage.load_history_page
+    monkeypatch.setattr(storage, "load_history_page",
+                        lambda *args: calls.append(args) or load_history_page(*args))
+    history = PagedHistory(storage, "amy", page_size=10)
+    records = history.get(40, 45)
+    assert len(calls) == 1
+    assert [record["result"] for record in records] == ["wins"] * 5
+    assert list(PagedHistory(storage, "amy", page_size=10))[40:45] == records
+    storage.close()
+
+
+def test_fetch_is_dropped_if_others_loaded_first(open_storage, play):
+    storage = open_storage()
+    play(storage, "amy", 20)
+    history = PagedHistory(storage, "amy", page_size=5)
+    fetched = history.fetch(10)
+    history.load_to(5)
+    assert history.add(fetched) == 0
+    assert history.loaded_count() == 5
+    assert len(history.get(0, 20)) == 20
+    storage.close()
@@ -0,0 +1,20 @@
+import logging
+from server import GameServer
+
+
+class FailingServer(GameServer):
+    def __init__(self):
+        pass
+
+    def dispatch(self, session, request):
+        raise ValueError("bad binary history header")
+
+
+def test_only_undecodable_lines_are_invalid_json(caplog):
+    server = FailingServer()
+    assert server.handle_line(None, "{not json")["error"] == "Invalid JSON"
+
+    with caplog.at_level(logging.ERROR, logger="server"):
+        response = server.handle_line(None, '{"id": 7, "op": "stats"}')
+    assert response == {"id": 7, "ok": False, "error": "Internal error"}
+    assert "bad binary history header" in caplog.text
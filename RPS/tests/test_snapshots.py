@@ -0,0 +1,44 @@
+from history_log import HistoryLog
+from snapshots import SnapshotStore, result_codes
+
+
+def record(username, result):
+    return {"username": username, "datetime": "2024-01-01 00:00:00",
+            "player": "rock", "computer": "rock", "result": result}
+
+
+def make_log(tmp_path, records):
+    log = HistoryLog(str(tmp_path / "history.log"), legacy_path=None)
+    log.recover()
+    log.append_many(records)
+    return log
+
+
+def test_results_are_snapshot_plus_tail(tmp_path):
+    rounds = [record("amy", "wins"), record("bob", "losses"), record("amy", "ties")]
+    log = make_log(tmp_path, rounds)
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    middle = log.end_offset()
+    store.compact(log, middle)
+    log.append_many([record("amy", "losses")])
+
+    assert store.results("amy", log, log.end_offset()) == result_codes(
+        [rounds[0], rounds[2], record("amy", "losses")])
+    # Up to an offset before the new round, it is not counted
+    assert store.results("amy", log, middle) == result_codes([rounds[0], rounds[2]])
+
+
+def test_interrupted_compaction_can_be_rerun(tmp_path):
+    rounds = [record("amy", "wins"), record("bob", "losses")] * 5
+    log = make_log(tmp_path, rounds)
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    store.compact(log, log.end_offset())
+
+    # Crash after the user snapshots were saved but before the compacted
+    # offset was: the rerun must not count the rounds twice
+    with open(store._offset_path, "w") as f:
+        f.write("0")
+    store.compact(log, log.end_offset())
+
+    assert store.results("amy", log, log.end_offset()) == result_codes(rounds[0::2])
+    assert store.results("bob", log, log.end_offset()) == result_codes(rounds[1::2])
@@ -0,0 +1,22 @@
+import numpy as np
+from game_utils import RPSGame, downsample_minmax
+
+
+def test_downsampled_points_keep_their_positions():
+    values = np.random.default_rng(0).random(1001).astype(np.float32)
+    for max_points in (1, 2, 3, 7, 500):
+        positions, kept = downsample_minmax(values, max_points)
+        assert len(kept) <= max_points
+        assert (values[positions] == kept).all()
+        assert (np.diff(positions) >= 0).all()
+    assert downsample_minmax(values, 1)[0].tolist() == [1000]
+
+
+def test_trend_points_are_placed_at_their_rounds(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    game = RPSGame()
+    game.win_rates.extend(float(i % 100) for i in range(2000))
+    rounds, trend = game.get_winrate_trend(500, positions=True)
+    assert len(trend) <= 500
+    assert rounds[-1] > 1900
+    assert [game.win_rates[i] for i in rounds] == trend
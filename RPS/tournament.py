@@ -0,0 +1,118 @@
+"""Round-robin tournament between computer strategies (and recorded humans).
+
+Every pair of strategies plays one match of --rounds rounds. Matches are
+independent, so they are spread over a process pool and the results are
+merged into a league table at the end.
+
+    python tournament.py --rounds 100000
+    python tournament.py --humans sonali prithika --storage excel
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from game_utils import RESULTS
+from simulation import WIN, LOSS, TIE
+from strategies import RecordedStrategy, default_strategies, play_match
+
+# Match points, as in a football league
+POINTS = {'wins': 3, 'ties': 1, 'losses': 0}
+
+
+def run_pair(a, b, rounds):
+    """Play one match (runs in a worker process) and count the rounds"""
+    started = time.perf_counter()
+    results = play_match(a, b, rounds)
+    counts = [int((results == code).sum()) for code in range(len(RESULTS))]
+    return {
+        'a': a.name,
+        'b': b.name,
+        'wins': counts[WIN],
+        'losses': counts[LOSS],
+        'ties': counts[TIE],
+        'seconds': time.perf_counter() - started
+    }
+
+
+def league_table(strategies, matches):
+    """Merge match results into one row per strategy, best first"""
+    table = {
+        s.name: {'name': s.name, 'played': 0, 'wins': 0, 'ties': 0, 'losses': 0, 'points': 0,
+                 'rounds_won': 0, 'rounds_lost': 0, 'rounds_tied': 0}
+        for s in strategies
+    }
+    for match in matches:
+        for side, won, lost in ((match['a'], match['wins'], match['losses']),
+                                (match['b'], match['losses'], match['wins'])):
+            row = table[side]
+            outcome = 'wins' if won > lost else 'losses' if won < lost else 'ties'
+            row['played'] += 1
+            row[outcome] += 1
+            row['points'] += POINTS[outcome]
+            row['rounds_won'] += won
+            row['rounds_lost'] += lost
+            row['rounds_tied'] += match['ties']
+
+    for row in table.values():
+        total = row['rounds_won'] + row['rounds_lost'] + row['rounds_tied']
+        row['round_win_rate'] = row['rounds_won'] / total * 100 if total else 0.0
+    return sorted(table.values(),
+                  key=lambda r: (r['points'], r['rounds_won'] - r['rounds_lost']), reverse=True)
+
+
+def run_tournament(strategies, rounds=10000, workers=None):
+    """Play every pair of strategies once across a process pool"""
+    names = [s.name for s in strategies]
+    if len(set(names)) != len(names):
+        raise ValueError("Strategy names must be unique")
+    pairs = list(itertools.combinations(strategies, 2))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_pair, a, b, rounds) for a, b in pairs]
+        matches = [future.result() for future in futures]
+    return league_table(strategies, matches), matches
+
+
+def format_table(table):
+    lines = [f"{'#':>2}  {'strategy':<20} {'P':>3} {'W':>3} {'D':>3} {'L':>3} {'pts':>4} {'round win %':>12}"]
+    for position, row in enumerate(table, 1):
+        lines.append(
+            f"{position:>2}  {row['name']:<20} {row['played']:>3} {row['wins']:>3} {row['ties']:>3} "
+            f"{row['losses']:>3} {row['points']:>4} {row['round_win_rate']:>11.1f}%")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round-robin tournament between RPS strategies")
+    parser.add_argument("--rounds", type=int, default=10000, help="Rounds per match")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--humans", nargs="*", default=[],
+                        help="Usernames whose recorded moves join the tournament")
+    parser.add_argument("--storage", default="excel", help="Storage backend to read human history from")
+    args = parser.parse_args()
+
+    strategies = default_strategies(seed=args.seed)
+    if args.humans:
+        from storage import open_storage
+        storage = open_storage(args.storage)
+        try:
+            for username in args.humans:
+                try:
+                    strategies.append(RecordedStrategy.from_storage(storage, username))
+                except ValueError:
+                    print(f"Skipping {username}: no recorded games")
+        finally:
+            storage.close()
+
+    started = time.perf_counter()
+    table, matches = run_tournament(strategies, rounds=args.rounds, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    print(format_table(table))
+    busy = sum(match['seconds'] for match in matches)
+    print(f"\n{len(matches)} matches x {args.rounds} rounds in {elapsed:.2f}s "
+          f"({busy:.2f}s of match time on {args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,14 @@
-import os
-import pandas as pd
 from datetime import datetime
+from storage import ExcelStorage
 
 class UserManager:
-    def __init__(self, excel_path="users.xlsx"):
+    def __init__(self, excel_path="users.xlsx", storage=None):
         self.excel_path = excel_path
         self.current_user = None
-        
-        # Create users file if it doesn't exist
-        if not os.path.exists(self.excel_path):
-            df = pd.DataFrame(columns=["username", "password", "email", "created_at", "last_login"])
-            df.to_excel(self.excel_path, index=False)
+        self.storage = storage if storage is not None else ExcelStorage(users_path=excel_path)
     
     def register_user(self, username, password, email):
         """Register a new user"""
-        # Read existing users
-        df = pd.read_excel(self.excel_path)
-        
-        # Check if username exists
-        if username in df["username"].values:
-            return False, "Username already exists"
-        
         # Add new user
         new_user = {
             "username": username,
@@ -30,25 +18,24 @@ class UserManager:
             "last_login": ""
         }
         
-        df = pd.concat([df, pd.DataFrame([new_user])], ignore_index=True)
-        df.to_excel(self.excel_path, index=False)
+        # Fails if the username already exists
+        if not self.storage.add_user(new_user):
+            return False, "Username already exists"
         return True, "Registration successful"
     
     def authenticate(self, username, password):
         """Authenticate a user"""
-        df = pd.read_excel(self.excel_path)
+        user = self.storage.get_user(username)
         
         # Check if user exists and password matches
-        user_row = df[df["username"] == username]
-        if len(user_row) == 0:
+        if user is None:
             return False, "User not found"
         
-        if user_row["password"].values[0] != password:
+        if user["password"] != password:
             return False, "Incorrect password"
         
         # Update last login
-        df.loc[df["username"] == username, "last_login"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        df.to_excel(self.excel_path, index=False)
+        self.storage.update_last_login(username, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         
         # Set current user
         self.current_user = username
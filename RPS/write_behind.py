@@ -0,0 +1,149 @@
+import logging
+import threading
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindStorage(Storage):
+    """Storage wrapper that queues rounds in memory and writes them in batches.
+
+    save_round only appends to an in-memory queue, so playing a round never
+    waits on disk. A background thread hands the queue to the wrapped backend
+    once batch_size rounds are pending or flush_interval seconds have passed,
+    whichever comes first. A crash therefore loses at most one flush window.
+    Call flush() on logout and close() on exit to write the remainder.
+    """
+
+    def __init__(self, backend, batch_size=50, flush_interval=1.0):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._pending_lock = threading.Condition()
+        # Serializes every call into the backend, including the flusher's
+        self._backend_lock = threading.RLock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._pending_lock:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._pending_lock.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self._flush_rounds()
+            except Exception:
+                logger.exception("Write-behind flush failed, will retry")
+                with self._pending_lock:
+                    self._pending_lock.wait(self.flush_interval)
+
+    def save_round(self, stats, record):
+        self.save_rounds([(stats, record)])
+
+    def save_rounds(self, rounds):
+        with self._pending_lock:
+            if self._closed:
+                raise RuntimeError("Storage is closed")
+            self._pending.extend(rounds)
+            if len(self._pending) >= self.batch_size:
+                self._pending_lock.notify()
+
+    def flush(self):
+        """Write every queued round, and anything the backend defers, now"""
+        with self._backend_lock:
+            self._flush_rounds()
+            self.backend.flush()
+
+    def _flush_rounds(self):
+        with self._backend_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self.backend.save_rounds(batch)
+            except Exception:
+                # Put the batch back in front of anything queued meanwhile
+                with self._pending_lock:
+                    self._pending[:0] = batch
+                raise
+
+    def pending_count(self):
+        """Number of rounds accepted but not yet written"""
+        with self._pending_lock:
+            return len(self._pending)
+
+    # Reads flush first so callers always see their own writes
+
+    def get_user(self, username):
+        with self._backend_lock:
+            return self.backend.get_user(username)
+
+    def add_user(self, user):
+        with self._backend_lock:
+            return self.backend.add_user(user)
+
+    def update_last_login(self, username, timestamp):
+        with self._backend_lock:
+            self.backend.update_last_login(username, timestamp)
+
+    def get_stats(self, username):
+        with self._backend_lock:
+            self._flush_rounds()
+            return self.backend.get_stats(username)
+
+    def create_stats(self, username):
+        with self._backend_lock:
+            self.backend.create_stats(username)
+
+    def iter_stats(self):
+        with self._backend_lock:
+            self._flush_rounds()
+            return iter(list(self.backend.iter_stats()))
+
+    def load_history(self, username):
+        with self._backend_lock:
+            self._flush_rounds()
+            return self.backend.load_history(username)
+
+    def history_cursor(self):
+        with self._backend_lock:
+            self._flush_rounds()
+            return self.backend.history_cursor()
+
+    def load_results(self, username):
+        with self._backend_lock:
+            self._flush_rounds()
+            return self.backend.load_results(username)
+
+    def load_history_page(self, username, before=None, limit=50):
+        with self._backend_lock:
+            if before is None:
+                self._flush_rounds()
+            return self.backend.load_history_page(username, before, limit)
+
+    def iter_history(self):
+        with self._backend_lock:
+            self._flush_rounds()
+            return iter(list(self.backend.iter_history()))
+
+    def export_history(self, path="game_history.xlsx"):
+        with self._backend_lock:
+            self._flush_rounds()
+            return self.backend.export_history(path)
+
+    def close(self):
+        """Stop the flusher, write what is left and close the backend"""
+        with self._pending_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending_lock.notify()
+        self._thread.join()
+        with self._backend_lock:
+            self._flush_rounds()
+            self.backend.close()